@@ -0,0 +1,125 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class CacheUsuarios:
+    """LRU em memória de usuários autenticados, com validade curta.
+
+    O cache é por processo: ``invalidar`` só limpa o processo atual, e nos
+    demais o usuário desativado deixa de ser aceito quando o TTL vence.
+    """
+
+    def __init__(self, ttl: float = 60.0, tamanho: int = 10000):
+        self.ttl = ttl
+        self.tamanho = tamanho
+        self._usuarios = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, usuario_id):
+        with self._lock:
+            entrada = self._usuarios.get(usuario_id)
+            if entrada is None:
+                return None
+            usuario, expira_em = entrada
+            if expira_em <= time.monotonic():
+                del self._usuarios[usuario_id]
+                return None
+            self._usuarios.move_to_end(usuario_id)
+        # Cada request recebe sua própria cópia, já que views podem anotar
+        # atributos em ``request.user``.
+        return copy.copy(usuario)
+
+    def guardar(self, usuario):
+        with self._lock:
+            self._usuarios[usuario.pk] = (usuario, time.monotonic() + self.ttl)
+            self._usuarios.move_to_end(usuario.pk)
+            while len(self._usuarios) > self.tamanho:
+                self._usuarios.popitem(last=False)
+
+    def invalidar(self, usuario_id):
+        with self._lock:
+            self._usuarios.pop(usuario_id, None)
+
+    def limpar(self):
+        with self._lock:
+            self._usuarios.clear()
+
+
+_cache_lock = threading.Lock()
+_caches = {}
+
+
+def obter_cache_usuarios() -> CacheUsuarios:
+    config = getattr(settings, "AUTENTICACAO_CACHE", {})
+    chave = (config.get("TTL", 60.0), config.get("TAMANHO", 10000))
+    with _cache_lock:
+        if chave not in _caches:
+            _caches[chave] = CacheUsuarios(ttl=chave[0], tamanho=chave[1])
+        return _caches[chave]
+
+
+def invalidar_usuario(usuario_id):
+    obter_cache_usuarios().invalidar(usuario_id)
+
+
+class JWTAutenticacaoCache(JWTAuthentication):
+    """``JWTAuthentication`` que evita o SELECT do usuário a cada request.
+
+    A assinatura e a validade do token continuam sendo verificadas sempre;
+    só a busca do ``User`` é servida pelo cache enquanto o TTL não vence.
+    """
+
+    def get_user(self, validated_token):
+        usuario = self._usuario_em_cache(validated_token)
+        if usuario is None:
+            usuario = self._buscar_usuario(validated_token)
+        return usuario
+
+    async def aauthenticate(self, request):
+        """Versão assíncrona de ``authenticate`` para as views async.
+
+        Ler o cabeçalho e validar o token não fazem I/O e rodam no próprio
+        event loop; só a busca do usuário, quando não está em cache, vai para
+        uma thread.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        usuario = self._usuario_em_cache(validated_token)
+        if usuario is None:
+            usuario = await sync_to_async(self._buscar_usuario)(validated_token)
+        return usuario, validated_token
+
+    def _usuario_em_cache(self, validated_token):
+        usuario_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if usuario_id is None:
+            return None
+        usuario = obter_cache_usuarios().obter(usuario_id)
+        if usuario is not None and self._token_vigente(usuario, validated_token):
+            return usuario
+        return None
+
+    def _buscar_usuario(self, validated_token):
+        usuario = super().get_user(validated_token)
+        obter_cache_usuarios().guardar(usuario)
+        return usuario
+
+    @staticmethod
+    def _token_vigente(usuario, validated_token) -> bool:
+        if not api_settings.CHECK_REVOKE_TOKEN:
+            return True
+        return validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) == get_md5_hash_password(usuario.password)
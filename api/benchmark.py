@@ -0,0 +1,327 @@
+import json
+import math
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from api.management.commands.recalcular_avaliacoes import recalcular_avaliacoes
+from api.models import (
+    AvaliacaoProduto,
+    CarrinhoCompra,
+    CarrinhoCompraItem,
+    Pedido,
+    Produto,
+)
+from api.renderers import JSONRapidoRenderer
+from api.serializacao import CodificadorLinhas
+from api.serializers import (
+    AvaliacaoProdutoSerializer,
+    PedidoSerializer,
+    ProdutoSerializer,
+)
+
+SENHA = "benchmark"
+LOTE = 1000
+
+CONFIGURACOES_STUB = {
+    "ALLOWED_HOSTS": ["testserver"],
+    "COTACAO": {"PROVEDOR": "api.cotacao.CotacaoFixa", "OPCOES": {"valor": 0.2}},
+    "CEP": {"CLIENTE": "api.cep.ClienteCepFixo"},
+}
+
+# Comportamento do SQLite sem ajustes: BEGIN deferred, journal de rollback,
+# fsync a cada commit e o busy timeout padrão de 5s do módulo sqlite3.
+SQLITE_PADRAO = {
+    "TRANSACTION_MODE": None,
+    "PRAGMAS": {
+        "journal_mode": "DELETE",
+        "busy_timeout": 5000,
+        "synchronous": "FULL",
+        "mmap_size": 0,
+    },
+}
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[posicao]
+
+
+def semear(
+    produtos: int,
+    usuarios: int,
+    avaliacoes: int,
+    carrinhos: int,
+    pedidos: int,
+    semente: int = 0,
+):
+    """Popula o banco com dados sintéticos na escala pedida."""
+    aleatorio = random.Random(semente)
+    senha = make_password(SENHA)
+
+    User.objects.bulk_create(
+        [User(username=f"benchmark{i}", password=senha) for i in range(usuarios)],
+        batch_size=LOTE,
+    )
+    Produto.objects.bulk_create(
+        [
+            Produto(
+                descricao=f"Produto sintético {i}",
+                valor=Decimal(aleatorio.randint(100, 50000)) / 100,
+                data_validade=date.today() + timedelta(days=aleatorio.randint(1, 720)),
+                estoque=aleatorio.randint(1000, 100000),
+            )
+            for i in range(produtos)
+        ],
+        batch_size=LOTE,
+    )
+    usuario_ids = list(User.objects.values_list("id", flat=True))
+    produtos_valor = dict(Produto.objects.values_list("id", "valor"))
+    produto_ids = list(produtos_valor)
+
+    for inicio in range(0, avaliacoes, LOTE):
+        AvaliacaoProduto.objects.bulk_create(
+            AvaliacaoProduto(
+                produto_id=aleatorio.choice(produto_ids),
+                usuario_id=aleatorio.choice(usuario_ids),
+                nota=aleatorio.randint(0, 5),
+                conteudo="Avaliação sintética",
+            )
+            for _ in range(min(LOTE, avaliacoes - inicio))
+        )
+    recalcular_avaliacoes()
+
+    status = [s for s, _ in Pedido.Status.choices]
+    for inicio in range(0, carrinhos, LOTE):
+        tamanho = min(LOTE, carrinhos - inicio)
+        novos_pedidos = Pedido.objects.bulk_create(
+            Pedido(
+                usuario_id=aleatorio.choice(usuario_ids),
+                status=aleatorio.choice(status),
+            )
+            for _ in range(max(0, min(tamanho, pedidos - inicio)))
+        )
+        novos_carrinhos = CarrinhoCompra.objects.bulk_create(
+            CarrinhoCompra(
+                usuario_id=aleatorio.choice(usuario_ids),
+                pedido=novos_pedidos[i] if i < len(novos_pedidos) else None,
+                valor_total=Decimal(0),
+            )
+            for i in range(tamanho)
+        )
+        itens = []
+        for carrinho in novos_carrinhos:
+            for produto_id in aleatorio.sample(produto_ids, min(3, len(produto_ids))):
+                quantidade = aleatorio.randint(1, 5)
+                valor = produtos_valor[produto_id]
+                itens.append(
+                    CarrinhoCompraItem(
+                        carrinho=carrinho,
+                        produto_id=produto_id,
+                        quantidade=quantidade,
+                        valor_produto=valor,
+                        valor_total=quantidade * valor,
+                    )
+                )
+                carrinho.valor_total += quantidade * valor
+        CarrinhoCompraItem.objects.bulk_create(itens, batch_size=LOTE)
+        CarrinhoCompra.objects.bulk_update(
+            novos_carrinhos, ["valor_total"], batch_size=LOTE
+        )
+
+
+class Medicoes:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.consultas = defaultdict(list)
+        self.falhas = defaultdict(int)
+
+    def registrar(self, etapa: str, segundos: float, consultas: int, ok: bool):
+        with self._lock:
+            self.latencias[etapa].append(segundos)
+            self.consultas[etapa].append(consultas)
+            if not ok:
+                self.falhas[etapa] += 1
+
+    def resumo(self) -> dict:
+        etapas = {}
+        for etapa, latencias in self.latencias.items():
+            etapas[etapa] = {
+                "requisicoes": len(latencias),
+                "falhas": self.falhas[etapa],
+                "media_ms": statistics.fmean(latencias) * 1000,
+                "p50_ms": percentil(latencias, 50) * 1000,
+                "p95_ms": percentil(latencias, 95) * 1000,
+                "p99_ms": percentil(latencias, 99) * 1000,
+                "consultas_por_requisicao": statistics.fmean(self.consultas[etapa]),
+            }
+        return etapas
+
+
+class FluxoCompra:
+    """Executa login → catálogo → detalhe → carrinho → pedido → cancelamento."""
+
+    def __init__(self, medicoes: Medicoes, semente: int = 0):
+        self.medicoes = medicoes
+        self.aleatorio = random.Random(semente)
+        self.client = Client(raise_request_exception=False)
+
+    def requisitar(self, etapa: str, metodo: str, url: str, dados="", **extra):
+        inicio = time.perf_counter()
+        with CaptureQueriesContext(connection) as consultas:
+            response = getattr(self.client, metodo)(
+                url, dados, content_type="application/json", **extra
+            )
+        duracao = time.perf_counter() - inicio
+        self.medicoes.registrar(
+            etapa, duracao, len(consultas), response.status_code < 400
+        )
+        return response
+
+    def executar(self, username: str, produto_ids: list):
+        response = self.requisitar(
+            "login", "post", "/login", {"username": username, "password": SENHA}
+        )
+        token = response.json()["access"]
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+        self.requisitar("produtos", "get", "/produtos", **auth)
+        produto_id = self.aleatorio.choice(produto_ids)
+        self.requisitar("produto_detalhe", "get", f"/produtos/{produto_id}", **auth)
+
+        itens = [
+            {"produto": pk, "quantidade": 1}
+            for pk in self.aleatorio.sample(produto_ids, min(3, len(produto_ids)))
+        ]
+        response = self.requisitar(
+            "carrinho_adicionar",
+            "post",
+            "/carrinho/adicionar",
+            {"itens": itens},
+            **auth,
+        )
+        if response.status_code >= 400:
+            return
+        response = self.requisitar(
+            "pedido_criar",
+            "post",
+            "/pedidos/criar",
+            {"carrinhos": [response.json()["id"]]},
+            **auth,
+        )
+        if response.status_code >= 400:
+            return
+        self.requisitar(
+            "pedido_cancelar",
+            "delete",
+            f"/pedidos/cancelar/{response.json()['id']}",
+            **auth,
+        )
+
+
+def executar(iteracoes: int, concorrencia: int = 1, semente: int = 0) -> dict:
+    cache.clear()
+    medicoes = Medicoes()
+    usernames = list(
+        User.objects.filter(username__startswith="benchmark").values_list(
+            "username", flat=True
+        )
+    )
+    produto_ids = list(Produto.objects.values_list("id", flat=True))
+
+    def rodar(indice: int):
+        try:
+            fluxo = FluxoCompra(medicoes, semente=semente + indice)
+            for i in range(indice, iteracoes, concorrencia):
+                fluxo.executar(usernames[i % len(usernames)], produto_ids)
+        finally:
+            if concorrencia > 1:
+                connection.close()
+
+    inicio = time.perf_counter()
+    if concorrencia > 1:
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            list(executor.map(rodar, range(concorrencia)))
+    else:
+        rodar(0)
+    duracao = time.perf_counter() - inicio
+
+    etapas = medicoes.resumo()
+    requisicoes = sum(e["requisicoes"] for e in etapas.values())
+    return {
+        "etapas": etapas,
+        "total": {
+            "iteracoes": iteracoes,
+            "concorrencia": concorrencia,
+            "requisicoes": requisicoes,
+            "falhas": sum(e["falhas"] for e in etapas.values()),
+            "duracao_s": duracao,
+            "requisicoes_por_segundo": requisicoes / duracao if duracao else 0.0,
+        },
+    }
+
+
+LISTAGENS = [
+    ("produtos", Produto, ProdutoSerializer),
+    ("pedidos", Pedido, PedidoSerializer),
+    ("avaliacoes", AvaliacaoProduto, AvaliacaoProdutoSerializer),
+]
+
+
+def _cronometrar(funcao, repeticoes: int):
+    melhor = math.inf
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def medir_serializacao(linhas: int, repeticoes: int = 5) -> dict:
+    """Compara ModelSerializer + JSONRenderer com CodificadorLinhas + orjson.
+
+    Cada caminho lê as mesmas ``linhas`` do banco e gera o corpo JSON; conta
+    o melhor de ``repeticoes`` tempos, consulta incluída.
+    """
+    resultado = {}
+    for nome, modelo, serializer_class in LISTAGENS:
+        queryset = modelo.objects.order_by("-atualizado_em", "-id")[:linhas]
+        codificador = CodificadorLinhas(serializer_class)
+        padrao, corpo_padrao = _cronometrar(
+            lambda: JSONRenderer().render(
+                serializer_class(list(queryset), many=True).data
+            ),
+            repeticoes,
+        )
+        rapido, corpo_rapido = _cronometrar(
+            lambda: JSONRapidoRenderer().render(
+                codificador.codificar(codificador.consultar(queryset))
+            ),
+            repeticoes,
+        )
+        quantidade = len(json.loads(corpo_padrao))
+        resultado[nome] = {
+            "linhas": quantidade,
+            "padrao_linhas_por_segundo": quantidade / padrao if padrao else 0.0,
+            "rapido_linhas_por_segundo": quantidade / rapido if rapido else 0.0,
+            "aceleracao": padrao / rapido if rapido else 0.0,
+            "identico": json.loads(corpo_padrao) == json.loads(corpo_rapido),
+        }
+    return resultado
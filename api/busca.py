@@ -0,0 +1,169 @@
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+TABELA = "api_produto_busca"
+
+
+def termos_busca(texto: str) -> list:
+    return [termo for termo in re.findall(r"\w+", texto.lower()) if termo]
+
+
+class BackendBusca(ABC):
+    @abstractmethod
+    def criar_indice(self, cursor):
+        ...
+
+    @abstractmethod
+    def indexar(self, produto_ids):
+        ...
+
+    @abstractmethod
+    def remover(self, produto_ids):
+        ...
+
+    @abstractmethod
+    def reconstruir(self, cursor):
+        """Refaz o índice inteiro usando ``cursor``, da conexão do chamador."""
+
+    @abstractmethod
+    def buscar(self, texto: str, limite: int) -> list:
+        ...
+
+
+class BuscaSqliteFts5(BackendBusca):
+    """Índice FTS5 com remoção de acentos e prefixos de 2 e 3 letras."""
+
+    def criar_indice(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+            "descricao, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+    def indexar(self, produto_ids):
+        produto_ids = list(produto_ids)
+        if not produto_ids:
+            return
+        marcadores = ", ".join(["%s"] * len(produto_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {TABELA} WHERE rowid IN ({marcadores})", produto_ids
+            )
+            cursor.execute(
+                f"INSERT INTO {TABELA} (rowid, descricao) "
+                f"SELECT id, descricao FROM api_produto WHERE id IN ({marcadores})",
+                produto_ids,
+            )
+
+    def remover(self, produto_ids):
+        produto_ids = list(produto_ids)
+        if not produto_ids:
+            return
+        marcadores = ", ".join(["%s"] * len(produto_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {TABELA} WHERE rowid IN ({marcadores})", produto_ids
+            )
+
+    def reconstruir(self, cursor):
+        cursor.execute(f"DELETE FROM {TABELA}")
+        cursor.execute(
+            f"INSERT INTO {TABELA} (rowid, descricao) "
+            "SELECT id, descricao FROM api_produto"
+        )
+
+    def buscar(self, texto: str, limite: int) -> list:
+        termos = termos_busca(texto)
+        if not termos:
+            return []
+        consulta = " ".join(f'"{termo}"*' for termo in termos)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s "
+                "ORDER BY rank LIMIT %s",
+                [consulta, limite],
+            )
+            return [linha[0] for linha in cursor.fetchall()]
+
+
+class BuscaPostgres(BackendBusca):
+    """Índice ``tsvector`` em português, sem acentos, com índice GIN."""
+
+    DOCUMENTO = "to_tsvector('portuguese', unaccent(p.descricao))"
+
+    def criar_indice(self, cursor):
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABELA} ("
+            "produto_id bigint PRIMARY KEY "
+            "REFERENCES api_produto (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "documento tsvector NOT NULL)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TABELA}_documento_idx "
+            f"ON {TABELA} USING GIN (documento)"
+        )
+
+    def indexar(self, produto_ids):
+        produto_ids = list(produto_ids)
+        if not produto_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {TABELA} (produto_id, documento) "
+                f"SELECT p.id, {self.DOCUMENTO} FROM api_produto p WHERE p.id = ANY(%s) "
+                "ON CONFLICT (produto_id) DO UPDATE SET documento = EXCLUDED.documento",
+                [produto_ids],
+            )
+
+    def remover(self, produto_ids):
+        produto_ids = list(produto_ids)
+        if not produto_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {TABELA} WHERE produto_id = ANY(%s)", [produto_ids]
+            )
+
+    def reconstruir(self, cursor):
+        cursor.execute(f"TRUNCATE {TABELA}")
+        cursor.execute(
+            f"INSERT INTO {TABELA} (produto_id, documento) "
+            f"SELECT p.id, {self.DOCUMENTO} FROM api_produto p"
+        )
+
+    def buscar(self, texto: str, limite: int) -> list:
+        termos = termos_busca(texto)
+        if not termos:
+            return []
+        consulta = " & ".join(f"{termo}:*" for termo in termos)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT produto_id FROM "
+                f"{TABELA}, to_tsquery('portuguese', unaccent(%s)) AS q "
+                "WHERE documento @@ q ORDER BY ts_rank(documento, q) DESC LIMIT %s",
+                [consulta, limite],
+            )
+            return [linha[0] for linha in cursor.fetchall()]
+
+
+BACKENDS_PADRAO = {
+    "sqlite": "api.busca.BuscaSqliteFts5",
+    "postgresql": "api.busca.BuscaPostgres",
+}
+
+
+def obter_backend_busca(vendor: str = None) -> BackendBusca:
+    """Backend configurado em ``BUSCA["BACKEND"]`` ou o padrão do banco.
+
+    Retorna ``None`` quando o banco em uso não tem backend de busca.
+    """
+    caminho = getattr(settings, "BUSCA", {}).get("BACKEND")
+    if caminho is None:
+        caminho = BACKENDS_PADRAO.get(vendor or connection.vendor)
+    if caminho is None:
+        return None
+    return import_string(caminho)()
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+def chave_detalhe(produto_id) -> str:
+    return f"produto:{int(produto_id)}:detalhe"
+
+
+def chave_versao(produto_id) -> str:
+    return f"produto:{int(produto_id)}:versao"
+
+
+def _timeout() -> int:
+    return getattr(settings, "PRODUTO_CACHE_TIMEOUT", 300)
+
+
+def obter_detalhes(produto_ids):
+    """Entradas válidas em cache e a versão atual de cada produto.
+
+    Cada produto tem um token de versão que a invalidação troca. Uma entrada
+    só vale se foi gravada com o token atual: um leitor lento que leu o banco
+    antes de uma invalidação grava com o token antigo, e essa entrada é
+    ignorada. Por isso a versão tem de ser obtida *antes* de ler o banco e
+    repassada para ``guardar_detalhes``.
+
+    Retorna ``(entradas, versoes)``, ambos por id.
+    """
+    produto_ids = [int(pk) for pk in produto_ids]
+    chaves = [chave_detalhe(pk) for pk in produto_ids]
+    chaves += [chave_versao(pk) for pk in produto_ids]
+    encontrados = cache.get_many(chaves)
+
+    versoes = {}
+    for pk in produto_ids:
+        versao = encontrados.get(chave_versao(pk))
+        if versao is None:
+            # add não sobrescreve um token gravado por uma invalidação
+            # concorrente; quem perder a corrida usa o token que ficou.
+            cache.add(chave_versao(pk), uuid.uuid4().hex, _timeout())
+            versao = cache.get(chave_versao(pk))
+        versoes[pk] = versao
+
+    entradas = {}
+    for pk in produto_ids:
+        entrada = encontrados.get(chave_detalhe(pk))
+        if entrada is not None and entrada.get("versao") == versoes[pk]:
+            entradas[pk] = entrada
+    return entradas, versoes
+
+
+def obter_detalhe(produto_id):
+    entradas, versoes = obter_detalhes([produto_id])
+    return entradas.get(int(produto_id)), versoes[int(produto_id)]
+
+
+def _entrada(data, versao) -> dict:
+    conteudo = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return {
+        "data": data,
+        "etag": hashlib.sha1(conteudo.encode()).hexdigest(),
+        "versao": versao,
+    }
+
+
+def guardar_detalhe(produto_id, data, versao) -> dict:
+    entrada = _entrada(data, versao)
+    cache.set(chave_detalhe(produto_id), entrada, _timeout())
+    return entrada
+
+
+def guardar_detalhes(dados: dict, versoes: dict) -> dict:
+    entradas = {pk: _entrada(data, versoes[pk]) for pk, data in dados.items()}
+    cache.set_many(
+        {chave_detalhe(pk): entrada for pk, entrada in entradas.items()},
+        _timeout(),
+    )
+    return entradas
+
+
+def invalidar_produtos(produto_ids):
+    produto_ids = [int(pk) for pk in produto_ids]
+    if not produto_ids:
+        return
+
+    def invalidar():
+        cache.set_many(
+            {chave_versao(pk): uuid.uuid4().hex for pk in produto_ids}, _timeout()
+        )
+        cache.delete_many([chave_detalhe(pk) for pk in produto_ids])
+
+    transaction.on_commit(invalidar)
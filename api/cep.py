@@ -0,0 +1,190 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import httpx
+import requests
+from django.conf import settings
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from django.utils.module_loading import import_string
+
+from api.http_async import obter_cliente_http
+from api.instrumentacao import medir
+from api.models import ConsultaCep
+
+
+class CepIndisponivel(Exception):
+    pass
+
+
+class ClienteViaCep:
+    def __init__(self, timeout: float = 3.0):
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def buscar(self, cep: str):
+        url = f"https://viacep.com.br/ws/{cep}/json/"
+        try:
+            with medir("http"):
+                response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as exc:
+            raise CepIndisponivel() from exc
+        return self._interpretar(response)
+
+    async def abuscar(self, cep: str):
+        url = f"https://viacep.com.br/ws/{cep}/json/"
+        try:
+            with medir("http"):
+                response = await obter_cliente_http().get(url, timeout=self.timeout)
+        except httpx.HTTPError as exc:
+            raise CepIndisponivel() from exc
+        return self._interpretar(response)
+
+    def _interpretar(self, response):
+        if response.status_code == 400:
+            return None
+        if response.status_code != 200:
+            raise CepIndisponivel()
+        data = response.json()
+        if data.get("erro"):
+            return None
+        return {
+            "cep": data["cep"],
+            "rua": data["logradouro"],
+            "bairro": data["bairro"],
+            "cidade": data["localidade"],
+            "estado": data["uf"],
+        }
+
+
+class ClienteCepFixo:
+    def __init__(self, enderecos: dict = None):
+        self.enderecos = enderecos or {}
+
+    def buscar(self, cep: str):
+        return self.enderecos.get(cep)
+
+    async def abuscar(self, cep: str):
+        return self.enderecos.get(cep)
+
+
+class ResolvedorCep:
+    """LRU em memória na frente da tabela ``ConsultaCep`` e do cliente externo.
+
+    CEPs inexistentes também são guardados (``dados`` nulo) e voltam a ser
+    consultados depois de ``ttl_negativo`` segundos.
+    """
+
+    def __init__(self, cliente, tamanho_lru: int = 10000, ttl_negativo: float = 86400):
+        self.cliente = cliente
+        self.tamanho_lru = tamanho_lru
+        self.ttl_negativo = timedelta(seconds=ttl_negativo)
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalizar(cep: str) -> str:
+        return re.sub(r"\D", "", cep)
+
+    def _expirado(self, dados, atualizado_em) -> bool:
+        return dados is None and timezone.now() - atualizado_em > self.ttl_negativo
+
+    def _lru_obter(self, cep: str):
+        with self._lock:
+            if cep not in self._lru:
+                return False, None
+            dados, atualizado_em = self._lru[cep]
+            if self._expirado(dados, atualizado_em):
+                del self._lru[cep]
+                return False, None
+            self._lru.move_to_end(cep)
+            return True, dados
+
+    def _lru_guardar(self, cep: str, dados, atualizado_em):
+        with self._lock:
+            self._lru[cep] = (dados, atualizado_em)
+            self._lru.move_to_end(cep)
+            while len(self._lru) > self.tamanho_lru:
+                self._lru.popitem(last=False)
+
+    def resolver(self, cep: str):
+        cep = self.normalizar(cep)
+        if len(cep) != 8:
+            return None
+        encontrado, dados = self._lru_obter(cep)
+        if encontrado:
+            return dados
+
+        consulta = ConsultaCep.objects.filter(cep=cep).first()
+        if consulta is not None and not self._expirado(
+            consulta.dados, consulta.atualizado_em
+        ):
+            self._lru_guardar(cep, consulta.dados, consulta.atualizado_em)
+            return consulta.dados
+
+        try:
+            dados = self.cliente.buscar(cep)
+        except CepIndisponivel:
+            if consulta is None:
+                raise
+            return consulta.dados
+        consulta, _ = ConsultaCep.objects.update_or_create(
+            cep=cep, defaults={"dados": dados}
+        )
+        self._lru_guardar(cep, dados, consulta.atualizado_em)
+        return dados
+
+    async def aresolver(self, cep: str):
+        cep = self.normalizar(cep)
+        if len(cep) != 8:
+            return None
+        encontrado, dados = self._lru_obter(cep)
+        if encontrado:
+            return dados
+
+        consulta = await ConsultaCep.objects.filter(cep=cep).afirst()
+        if consulta is not None and not self._expirado(
+            consulta.dados, consulta.atualizado_em
+        ):
+            self._lru_guardar(cep, consulta.dados, consulta.atualizado_em)
+            return consulta.dados
+
+        abuscar = getattr(self.cliente, "abuscar", None)
+        if abuscar is None:
+            abuscar = sync_to_async(self.cliente.buscar, thread_sensitive=False)
+        try:
+            dados = await abuscar(cep)
+        except CepIndisponivel:
+            if consulta is None:
+                raise
+            return consulta.dados
+        consulta, _ = await ConsultaCep.objects.aupdate_or_create(
+            cep=cep, defaults={"dados": dados}
+        )
+        self._lru_guardar(cep, dados, consulta.atualizado_em)
+        return dados
+
+    def limpar(self):
+        with self._lock:
+            self._lru.clear()
+
+
+_resolvedores = {}
+_resolvedores_lock = threading.Lock()
+
+
+def obter_resolvedor_cep() -> ResolvedorCep:
+    config = getattr(settings, "CEP", {})
+    caminho = config.get("CLIENTE", "api.cep.ClienteViaCep")
+    opcoes = config.get("OPCOES", {})
+    chave = (caminho, repr(sorted(opcoes.items())))
+    with _resolvedores_lock:
+        if chave not in _resolvedores:
+            _resolvedores[chave] = ResolvedorCep(
+                import_string(caminho)(**opcoes),
+                tamanho_lru=config.get("TAMANHO_LRU", 10000),
+                ttl_negativo=config.get("TTL_NEGATIVO", 86400),
+            )
+        return _resolvedores[chave]
@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api import estoque, fila, vendas
+from api.fields import CentavosField
+from api.models import (
+    CarrinhoCompra,
+    CarrinhoCompraItem,
+    ChaveIdempotencia,
+    Pedido,
+    Produto,
+    ReservaEstoque,
+)
+
+
+class CarrinhoVazio(Exception):
+    pass
+
+
+def recalcular_totais(carrinho_ids):
+    """Grava em cada carrinho a soma dos seus itens com um único UPDATE."""
+    soma = (
+        CarrinhoCompraItem.objects.filter(carrinho=OuterRef("pk"))
+        .order_by()
+        .values("carrinho")
+        .annotate(total=Sum("valor_total"))
+        .values("total")
+    )
+    CarrinhoCompra.objects.filter(pk__in=list(carrinho_ids)).update(
+        valor_total=Coalesce(Subquery(soma), 0, output_field=CentavosField())
+    )
+
+
+def _finalizar(usuario) -> Pedido:
+    carrinhos = list(
+        CarrinhoCompra.objects.select_for_update().filter(usuario=usuario, pedido=None)
+    )
+    if not carrinhos:
+        raise CarrinhoVazio()
+    itens = list(CarrinhoCompraItem.objects.filter(carrinho__in=carrinhos))
+    if not itens:
+        raise CarrinhoVazio()
+
+    # Os itens são cobrados pelo preço atual do produto, não pelo preço do
+    # momento em que entraram no carrinho.
+    produtos = Produto.objects.select_for_update().in_bulk(
+        {item.produto_id for item in itens}
+    )
+    alterados = []
+    for item in itens:
+        valor = produtos[item.produto_id].valor
+        if item.valor_produto != valor:
+            item.valor_produto = valor
+            item.valor_total = item.quantidade * valor
+            alterados.append(item)
+    if alterados:
+        CarrinhoCompraItem.objects.bulk_update(
+            alterados, ["valor_produto", "valor_total"]
+        )
+
+    # Confirma as reservas feitas ao montar o carrinho; as que expiraram
+    # voltam a debitar o estoque e falham juntas se ele acabou.
+    estoque.confirmar(ReservaEstoque.objects.filter(carrinho__in=carrinhos))
+
+    pedido = Pedido.objects.create(usuario=usuario)
+    CarrinhoCompra.objects.filter(pk__in=[c.pk for c in carrinhos]).update(pedido=pedido)
+    if alterados:
+        recalcular_totais(carrinho.pk for carrinho in carrinhos)
+
+    vendas.registrar_pedido(pedido)
+    fila.enfileirar("processar_pedido", {"pedido_id": pedido.pk})
+    return pedido
+
+
+def _validade_chave() -> timedelta:
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCIA_VALIDADE", 86400))
+
+
+def limpar_chaves_idempotencia(agora=None) -> int:
+    """Apaga as chaves de idempotência que passaram da validade.
+
+    Uma chave vencida já não devolve o pedido (veja ``_pedido_da_chave``),
+    então apagá-la não muda o comportamento do checkout.
+    """
+    agora = agora or timezone.now()
+    total, _ = ChaveIdempotencia.objects.filter(
+        criado_em__lt=agora - _validade_chave()
+    ).delete()
+    return total
+
+
+def _pedido_da_chave(usuario, chave: str):
+    registro = (
+        ChaveIdempotencia.objects.filter(usuario=usuario, chave=chave)
+        .select_related("pedido")
+        .first()
+    )
+    if registro is None:
+        return None
+    if registro.criado_em < timezone.now() - _validade_chave():
+        registro.delete()
+        return None
+    return registro.pedido
+
+
+def finalizar_compra(usuario, chave: str = None):
+    """Transforma os carrinhos abertos do usuário num pedido.
+
+    Com ``chave`` (o header ``Idempotency-Key``) a mesma requisição repetida
+    devolve o pedido já criado em vez de criar outro. Retorna
+    ``(pedido, repetido)``.
+    """
+    if chave is None:
+        with transaction.atomic():
+            return _finalizar(usuario), False
+
+    try:
+        with transaction.atomic():
+            pedido = _pedido_da_chave(usuario, chave)
+            if pedido is not None:
+                return pedido, True
+            # A chave é gravada antes de tocar nos carrinhos: uma requisição
+            # concorrente com a mesma chave fica presa na restrição única até
+            # esta terminar, em vez de disputar os carrinhos.
+            registro = ChaveIdempotencia.objects.create(usuario=usuario, chave=chave)
+            registro.pedido = pedido = _finalizar(usuario)
+            registro.save(update_fields=["pedido"])
+            return pedido, False
+    except IntegrityError:
+        # Outra requisição com a mesma chave terminou primeiro; a transação
+        # desta foi desfeita e o pedido dela é o resultado.
+        pedido = _pedido_da_chave(usuario, chave)
+        if pedido is None:
+            raise
+        return pedido, True
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from api.http_async import obter_cliente_http
+from api.instrumentacao import medir
+
+
+class ProvedorCotacao(ABC):
+    """Mantém a cotação BRL→USD em memória por ``ttl`` segundos.
+
+    Apenas uma atualização acontece por vez: quem chega enquanto outra
+    requisição está buscando a cotação recebe o valor antigo, se houver,
+    ou espera a mesma busca terminar. Se a busca falhar e já existir um
+    valor, o valor antigo continua sendo servido.
+
+    ``aobter`` é a versão assíncrona: com um valor antigo disponível ele é
+    devolvido na hora e a atualização segue em segundo plano.
+    """
+
+    def __init__(self, ttl: float = 600.0):
+        self.ttl = ttl
+        self._valor = None
+        self._expira_em = 0.0
+        self._lock = threading.Lock()
+        self._tarefa = None
+
+    @abstractmethod
+    def buscar(self) -> float:
+        """Consulta a cotação na origem, sem cache."""
+
+    async def abuscar(self) -> float:
+        return await sync_to_async(self.buscar, thread_sensitive=False)()
+
+    async def aobter(self) -> float:
+        if self._valor is not None and time.monotonic() < self._expira_em:
+            return self._valor
+        loop = asyncio.get_running_loop()
+        tarefa = self._tarefa
+        if tarefa is None or tarefa.done() or tarefa.get_loop() is not loop:
+            tarefa = self._tarefa = loop.create_task(self._aatualizar())
+        if self._valor is not None:
+            return self._valor
+        return await asyncio.shield(tarefa)
+
+    async def _aatualizar(self) -> float:
+        try:
+            valor = await self.abuscar()
+        except Exception:
+            if self._valor is None:
+                raise
+            return self._valor
+        self._valor = valor
+        self._expira_em = time.monotonic() + self.ttl
+        return valor
+
+    def obter(self) -> float:
+        if self._valor is not None and time.monotonic() < self._expira_em:
+            return self._valor
+        if self._valor is None:
+            self._lock.acquire()
+        elif not self._lock.acquire(blocking=False):
+            return self._valor
+        try:
+            if self._valor is not None and time.monotonic() < self._expira_em:
+                return self._valor
+            try:
+                valor = self.buscar()
+            except Exception:
+                if self._valor is None:
+                    raise
+                return self._valor
+            self._valor = valor
+            self._expira_em = time.monotonic() + self.ttl
+            return valor
+        finally:
+            self._lock.release()
+
+    def limpar(self):
+        with self._lock:
+            self._valor = None
+            self._expira_em = 0.0
+
+
+class ExchangeRateApiProvedor(ProvedorCotacao):
+    CHAVE_API = "c94b00ef414eb7272d1bcca0"
+
+    def __init__(self, ttl: float = 600.0, timeout: float = 3.0):
+        super().__init__(ttl=ttl)
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def buscar(self) -> float:
+        url = f"https://v6.exchangerate-api.com/v6/{self.CHAVE_API}/latest/BRL"
+        with medir("http"):
+            response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("conversion_rates").get("USD")
+
+    async def abuscar(self) -> float:
+        url = f"https://v6.exchangerate-api.com/v6/{self.CHAVE_API}/latest/BRL"
+        with medir("http"):
+            response = await obter_cliente_http().get(url, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("conversion_rates").get("USD")
+
+
+class CotacaoFixa(ProvedorCotacao):
+    def __init__(self, valor: float = 0.2, **kwargs):
+        super().__init__(**kwargs)
+        self.valor = valor
+
+    def buscar(self) -> float:
+        return self.valor
+
+    async def abuscar(self) -> float:
+        return self.valor
+
+
+_provedores = {}
+_provedores_lock = threading.Lock()
+
+
+def obter_provedor_cotacao() -> ProvedorCotacao:
+    config = getattr(settings, "COTACAO", {})
+    caminho = config.get("PROVEDOR", "api.cotacao.ExchangeRateApiProvedor")
+    opcoes = config.get("OPCOES", {})
+    chave = (caminho, tuple(sorted(opcoes.items())))
+    with _provedores_lock:
+        if chave not in _provedores:
+            _provedores[chave] = import_string(caminho)(**opcoes)
+        return _provedores[chave]
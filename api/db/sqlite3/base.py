@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Backend SQLite que aplica ``settings.SQLITE`` a cada conexão.
+
+    ``PRAGMAS`` são executados logo após abrir a conexão. ``TRANSACTION_MODE``
+    define como ``transaction.atomic`` abre a transação: com ``IMMEDIATE`` o
+    lock de escrita é pego no BEGIN e escritores concorrentes esperam pelo
+    ``busy_timeout``, em vez de falharem com "database is locked" ao tentar
+    promover uma transação de leitura.
+    """
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for nome, valor in getattr(settings, "SQLITE", {}).get("PRAGMAS", {}).items():
+            conn.execute(f"PRAGMA {nome} = {valor}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        modo = getattr(settings, "SQLITE", {}).get("TRANSACTION_MODE")
+        self.cursor().execute(f"BEGIN {modo}" if modo else "BEGIN")
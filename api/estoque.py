@@ -0,0 +1,127 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from api.cache_produto import invalidar_produtos
+from api.models import Produto, ReservaEstoque
+
+
+class EstoqueInsuficiente(Exception):
+    def __init__(self, produtos: list):
+        super().__init__(f"Estoque insuficiente para os produtos {produtos}")
+        self.produtos = produtos
+
+
+def _variacao(quantidades: dict):
+    return Case(
+        *[When(pk=pk, then=Value(n)) for pk, n in quantidades.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _debitar(quantidades: dict):
+    if not quantidades:
+        return
+    variacao = _variacao(quantidades)
+    atualizados = Produto.objects.filter(
+        pk__in=list(quantidades), estoque__gte=variacao
+    ).update(estoque=F("estoque") - variacao)
+    invalidar_produtos(quantidades)
+    if atualizados != len(quantidades):
+        estoques = dict(
+            Produto.objects.filter(pk__in=list(quantidades)).values_list(
+                "pk", "estoque"
+            )
+        )
+        raise EstoqueInsuficiente(
+            [pk for pk, n in quantidades.items() if estoques.get(pk, 0) < n]
+        )
+
+
+def _creditar(quantidades: dict):
+    if not quantidades:
+        return
+    variacao = _variacao(quantidades)
+    Produto.objects.filter(pk__in=list(quantidades)).update(
+        estoque=F("estoque") + variacao
+    )
+    invalidar_produtos(quantidades)
+
+
+def _reivindicar(reservas, de: list, para: str) -> dict:
+    # Marca as reservas com um lote próprio para saber exatamente quais
+    # linhas esta chamada mudou de estado, mesmo com outros workers
+    # disputando as mesmas reservas.
+    lote = uuid.uuid4()
+    alteradas = reservas.filter(status__in=de).update(
+        status=para, lote=lote, atualizado_em=timezone.now()
+    )
+    if alteradas == 0:
+        return {}
+    return dict(
+        ReservaEstoque.objects.filter(lote=lote)
+        .values("produto_id")
+        .annotate(total=Sum("quantidade"))
+        .values_list("produto_id", "total")
+    )
+
+
+def reservar(quantidades: dict, carrinho=None, validade: timedelta = None):
+    quantidades = {pk: n for pk, n in quantidades.items() if n > 0}
+    if validade is None:
+        validade = timedelta(seconds=getattr(settings, "RESERVA_VALIDADE", 900))
+    expira_em = timezone.now() + validade
+    with transaction.atomic():
+        _debitar(quantidades)
+        return ReservaEstoque.objects.bulk_create(
+            [
+                ReservaEstoque(
+                    produto_id=pk,
+                    carrinho=carrinho,
+                    quantidade=n,
+                    expira_em=expira_em,
+                )
+                for pk, n in quantidades.items()
+            ]
+        )
+
+
+def liberar(reservas, incluir_confirmadas: bool = False) -> int:
+    de = [ReservaEstoque.Status.ATIVA]
+    if incluir_confirmadas:
+        de.append(ReservaEstoque.Status.CONFIRMADA)
+    with transaction.atomic():
+        quantidades = _reivindicar(reservas, de, ReservaEstoque.Status.LIBERADA)
+        _creditar(quantidades)
+    return sum(quantidades.values())
+
+
+def confirmar(reservas) -> int:
+    with transaction.atomic():
+        ativas = _reivindicar(
+            reservas, [ReservaEstoque.Status.ATIVA], ReservaEstoque.Status.CONFIRMADA
+        )
+        expiradas = _reivindicar(
+            reservas,
+            [ReservaEstoque.Status.EXPIRADA],
+            ReservaEstoque.Status.CONFIRMADA,
+        )
+        _debitar(expiradas)
+    return sum(ativas.values()) + sum(expiradas.values())
+
+
+def expirar(agora=None) -> int:
+    agora = agora or timezone.now()
+    with transaction.atomic():
+        quantidades = _reivindicar(
+            ReservaEstoque.objects.filter(expira_em__lt=agora),
+            [ReservaEstoque.Status.ATIVA],
+            ReservaEstoque.Status.EXPIRADA,
+        )
+        _creditar(quantidades)
+    return sum(quantidades.values())
@@ -0,0 +1,81 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from api.models import CarrinhoCompraItem
+
+COLUNAS = {
+    "pedido_id": "carrinho__pedido_id",
+    "pedido_status": "carrinho__pedido__status",
+    # ``atualizado_em`` é o auto_now_add do pedido, ou seja, quando foi feito;
+    # ``criado_em`` muda a cada mudança de status.
+    "pedido_atualizado_em": "carrinho__pedido__atualizado_em",
+    "usuario_id": "carrinho__pedido__usuario_id",
+    "carrinho_id": "carrinho_id",
+    "item_id": "id",
+    "produto_id": "produto_id",
+    "produto_descricao": "produto__descricao",
+    "quantidade": "quantidade",
+    "valor_produto": "valor_produto",
+    "valor_total": "valor_total",
+}
+
+
+class _Eco:
+    def write(self, valor):
+        return valor
+
+
+def interpretar_data(valor: str, fim: bool = False):
+    """Converte ``AAAA-MM-DD`` ou ISO 8601 em datetime com fuso.
+
+    Uma data simples usada como fim do intervalo inclui o dia inteiro.
+    """
+    # A data simples é testada primeiro: parse_datetime também aceita
+    # ``AAAA-MM-DD`` e a leria como meia-noite, excluindo o último dia.
+    try:
+        dia = parse_date(valor)
+        momento = parse_datetime(valor) if dia is None else None
+    except ValueError:
+        return None
+    if momento is None:
+        if dia is None:
+            return None
+        momento = datetime.combine(dia + timedelta(days=1) if fim else dia, time.min)
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def itens_vendidos(de=None, ate=None):
+    itens = CarrinhoCompraItem.objects.filter(carrinho__pedido__isnull=False)
+    if de is not None:
+        itens = itens.filter(carrinho__pedido__atualizado_em__gte=de)
+    if ate is not None:
+        itens = itens.filter(carrinho__pedido__atualizado_em__lt=ate)
+    return (
+        itens.order_by("carrinho__pedido_id", "carrinho_id", "id")
+        .values_list(*COLUNAS.values())
+        .iterator(chunk_size=getattr(settings, "EXPORTACAO_CHUNK_SIZE", 2000))
+    )
+
+
+def gerar_csv(linhas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS.keys())
+    for linha in linhas:
+        yield escritor.writerow(
+            valor.isoformat() if hasattr(valor, "isoformat") else valor
+            for valor in linha
+        )
+
+
+def gerar_ndjson(linhas):
+    nomes = list(COLUNAS)
+    for linha in linhas:
+        yield json.dumps(dict(zip(nomes, linha)), cls=DjangoJSONEncoder) + "\n"
@@ -0,0 +1,52 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import models
+
+CENTAVO = Decimal("0.01")
+
+
+class CentavosField(models.DecimalField):
+    """Valor monetário gravado no banco como inteiro de centavos.
+
+    No Python o valor é um ``Decimal`` em reais com duas casas, como num
+    ``DecimalField``; na coluna é um ``bigint``. Somas e comparações feitas
+    pelo banco são exatas em qualquer backend (o SQLite guardaria um
+    ``DecimalField`` comum como REAL).
+
+    Expressões que misturam esta coluna com outros tipos numéricos precisam
+    de ``output_field=CentavosField()`` explícito, senão o Django trata o
+    resultado como reais e não como centavos.
+    """
+
+    def __init__(self, *args, max_digits=14, decimal_places=2, **kwargs):
+        super().__init__(
+            *args, max_digits=max_digits, decimal_places=decimal_places, **kwargs
+        )
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if kwargs.get("max_digits") == 14:
+            del kwargs["max_digits"]
+        if kwargs.get("decimal_places") == 2:
+            del kwargs["decimal_places"]
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return "BigIntegerField"
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if hasattr(value, "as_sql"):
+            return value
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None:
+            return value
+        return int((value / CENTAVO).to_integral_value(rounding=ROUND_HALF_UP))
+
+    def get_db_prep_save(self, value, connection):
+        return self.get_db_prep_value(value, connection)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return (Decimal(int(value)) * CENTAVO).quantize(CENTAVO)
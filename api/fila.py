@@ -0,0 +1,141 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+
+def _config() -> dict:
+    return getattr(settings, "FILA", {})
+
+
+def enfileirar(tipo: str, dados: dict, atraso: timedelta = None) -> Tarefa:
+    """Cria uma tarefa na fila.
+
+    Chamado dentro de ``transaction.atomic`` a tarefa só fica visível para os
+    workers junto com o commit, então nunca processa dados que não existem.
+    """
+    return Tarefa.objects.create(
+        tipo=tipo,
+        dados=dados,
+        max_tentativas=_config().get("MAX_TENTATIVAS", 5),
+        disponivel_em=timezone.now() + (atraso or timedelta()),
+    )
+
+
+def _disponiveis(agora):
+    # Tarefas em processamento cujo prazo de visibilidade venceu pertencem a
+    # um worker que morreu ou travou e voltam a ser reivindicáveis.
+    return Tarefa.objects.filter(
+        status__in=[Tarefa.Status.PENDENTE, Tarefa.Status.PROCESSANDO],
+        disponivel_em__lte=agora,
+    )
+
+
+def reivindicar(limite: int, tipos: list = None) -> list:
+    """Reivindica até ``limite`` tarefas disponíveis para este worker.
+
+    No Postgres as linhas são travadas com ``FOR UPDATE SKIP LOCKED``, então
+    workers concorrentes pegam tarefas diferentes sem esperar uns pelos outros.
+    No SQLite, que não tem ``SKIP LOCKED``, o UPDATE condicional marcado com
+    um lote próprio garante que cada tarefa fique com um único worker.
+    """
+    agora = timezone.now()
+    visibilidade = timedelta(seconds=_config().get("VISIBILIDADE", 300))
+    lote = uuid.uuid4()
+    with transaction.atomic():
+        candidatas = _disponiveis(agora)
+        if tipos:
+            candidatas = candidatas.filter(tipo__in=tipos)
+        candidatas = candidatas.order_by("disponivel_em", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            candidatas = candidatas.select_for_update(skip_locked=True)
+        ids = list(candidatas.values_list("id", flat=True)[:limite])
+        if not ids:
+            return []
+        _disponiveis(agora).filter(id__in=ids).update(
+            status=Tarefa.Status.PROCESSANDO,
+            tentativas=F("tentativas") + 1,
+            disponivel_em=agora + visibilidade,
+            lote=lote,
+        )
+    return list(Tarefa.objects.filter(lote=lote).order_by("id"))
+
+
+def _atrasar(tentativas: int) -> timedelta:
+    base = _config().get("ATRASO_BASE", 5)
+    return timedelta(seconds=min(base * 2 ** (tentativas - 1), 3600))
+
+
+def _concluir(tarefas: list):
+    # Todas vieram da mesma reivindicação, então compartilham o lote.
+    Tarefa.objects.filter(id__in=[t.id for t in tarefas], lote=tarefas[0].lote).update(
+        status=Tarefa.Status.CONCLUIDA, erro=""
+    )
+
+
+def _falhar(tarefa: Tarefa, erro: Exception):
+    logger.warning("Tarefa %s (%s) falhou: %r", tarefa.pk, tarefa.tipo, erro)
+    if tarefa.tentativas >= tarefa.max_tentativas:
+        campos = {"status": Tarefa.Status.FALHOU}
+    else:
+        campos = {
+            "status": Tarefa.Status.PENDENTE,
+            "disponivel_em": timezone.now() + _atrasar(tarefa.tentativas),
+        }
+    # Filtrar pelo lote evita sobrescrever a tarefa se a visibilidade venceu
+    # e outro worker já a reivindicou.
+    Tarefa.objects.filter(pk=tarefa.pk, lote=tarefa.lote).update(
+        erro=repr(erro), **campos
+    )
+
+
+def _executor(tipo: str):
+    caminho = _config().get("TAREFAS", {}).get(tipo)
+    if caminho is None:
+        raise LookupError(f"Tipo de tarefa desconhecido: {tipo}")
+    return import_string(caminho)
+
+
+def _executar(tipo: str, tarefas: list):
+    try:
+        executor = _executor(tipo)
+        with transaction.atomic():
+            executor(tarefas)
+            _concluir(tarefas)
+        return
+    except Exception as exc:
+        if len(tarefas) == 1:
+            _falhar(tarefas[0], exc)
+            return
+    # O lote falhou como um todo; reexecuta uma a uma para isolar a tarefa
+    # problemática sem atrasar as demais.
+    for tarefa in tarefas:
+        _executar(tipo, [tarefa])
+
+
+def processar_lote(limite: int = None, tipos: list = None) -> int:
+    """Reivindica e executa um lote; retorna quantas tarefas foram tratadas.
+
+    Os executores recebem todas as tarefas do mesmo tipo de uma vez e rodam
+    numa transação junto com a confirmação das tarefas. A entrega é "ao menos
+    uma vez": se a visibilidade vencer no meio da execução a tarefa pode rodar
+    de novo, então os executores precisam ser idempotentes.
+    """
+    limite = limite or _config().get("TAMANHO_LOTE", 100)
+    tarefas = reivindicar(limite, tipos)
+    por_tipo = defaultdict(list)
+    for tarefa in tarefas:
+        por_tipo[tarefa.tipo].append(tarefa)
+    for tipo, grupo in por_tipo.items():
+        _executar(tipo, grupo)
+    return len(tarefas)
@@ -0,0 +1,42 @@
+import django_filters
+from django.utils import timezone
+from rest_framework.filters import OrderingFilter
+
+from api.models import Produto
+
+
+class ProdutoFiltro(django_filters.FilterSet):
+    valor_min = django_filters.NumberFilter(field_name="valor", lookup_expr="gte")
+    valor_max = django_filters.NumberFilter(field_name="valor", lookup_expr="lte")
+    validade_de = django_filters.DateFilter(field_name="data_validade", lookup_expr="gte")
+    validade_ate = django_filters.DateFilter(field_name="data_validade", lookup_expr="lte")
+    nota_minima = django_filters.NumberFilter(field_name="nota_media", lookup_expr="gte")
+    em_estoque = django_filters.BooleanFilter(method="filtrar_em_estoque")
+    nao_vencido = django_filters.BooleanFilter(method="filtrar_nao_vencido")
+
+    class Meta:
+        model = Produto
+        fields = []
+
+    def filtrar_em_estoque(self, queryset, name, value):
+        if value:
+            return queryset.filter(estoque__gt=0)
+        return queryset.filter(estoque__lte=0)
+
+    def filtrar_nao_vencido(self, queryset, name, value):
+        hoje = timezone.localdate()
+        if value:
+            return queryset.filter(data_validade__gte=hoje)
+        return queryset.filter(data_validade__lt=hoje)
+
+
+class OrdenacaoFiltro(OrderingFilter):
+    """Acrescenta ``id`` como desempate para a paginação por cursor ser estável."""
+
+    def get_ordering(self, request, queryset, view):
+        ordenacao = list(super().get_ordering(request, queryset, view))
+        campos = {campo.lstrip("-") for campo in ordenacao}
+        if "id" not in campos and "pk" not in campos:
+            desc = ordenacao[0].startswith("-") if ordenacao else True
+            ordenacao.append("-id" if desc else "id")
+        return ordenacao
@@ -0,0 +1,28 @@
+import asyncio
+import weakref
+
+import httpx
+from django.conf import settings
+
+_clientes = weakref.WeakKeyDictionary()
+
+
+def obter_cliente_http() -> httpx.AsyncClient:
+    """Devolve o ``AsyncClient`` compartilhado do event loop atual.
+
+    O pool de conexões de um ``AsyncClient`` pertence ao loop em que foi
+    criado, por isso há um cliente por loop em vez de um global.
+    """
+    loop = asyncio.get_running_loop()
+    cliente = _clientes.get(loop)
+    if cliente is None:
+        config = getattr(settings, "HTTP_ASYNC", {})
+        cliente = httpx.AsyncClient(
+            timeout=config.get("TIMEOUT", 3.0),
+            limits=httpx.Limits(
+                max_connections=config.get("MAX_CONEXOES", 200),
+                max_keepalive_connections=config.get("MAX_CONEXOES_OCIOSAS", 50),
+            ),
+        )
+        _clientes[loop] = cliente
+    return cliente
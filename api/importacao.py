@@ -0,0 +1,148 @@
+import csv
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from api.busca import obter_backend_busca
+from api.cache_produto import invalidar_produtos
+from api.models import Produto, ReservaEstoque
+
+CAMPOS_ATUALIZADOS = ["descricao", "valor", "data_validade", "estoque"]
+
+
+class ProdutoImportacaoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Produto
+        fields = ["sku", "descricao", "valor", "data_validade", "estoque"]
+        extra_kwargs = {
+            "sku": {"required": True, "allow_null": False, "validators": []},
+        }
+
+
+def linhas_texto(stream, encoding: str = "utf-8"):
+    for linha in iter(stream.readline, b""):
+        yield linha.decode(encoding) if isinstance(linha, bytes) else linha
+
+
+def ler_registros(linhas, formato: str):
+    if formato == "csv":
+        yield from csv.DictReader(linhas)
+    elif formato == "jsonl":
+        for linha in linhas:
+            if linha.strip():
+                try:
+                    yield json.loads(linha)
+                except json.JSONDecodeError as exc:
+                    yield exc
+    else:
+        raise ValueError(f"Formato de importação desconhecido: {formato}")
+
+
+def _gravar_lote(produtos: dict) -> int:
+    if not produtos:
+        return 0
+    with transaction.atomic():
+        Produto.objects.bulk_create(
+            produtos.values(),
+            update_conflicts=True,
+            unique_fields=["sku"],
+            update_fields=CAMPOS_ATUALIZADOS,
+        )
+        pks = list(
+            Produto.objects.filter(sku__in=list(produtos)).values_list("pk", flat=True)
+        )
+        # O estoque importado é o total disponível, mas Produto.estoque já
+        # desconta as reservas ativas dos carrinhos, que voltam a ser
+        # creditadas quando expiram ou são liberadas. Sem este desconto essas
+        # unidades seriam contadas duas vezes. O resultado pode ficar negativo
+        # se as reservas passarem do estoque importado; ele volta ao valor
+        # certo conforme elas são liberadas.
+        reservado = (
+            ReservaEstoque.objects.filter(
+                produto=OuterRef("pk"), status=ReservaEstoque.Status.ATIVA
+            )
+            .order_by()
+            .values("produto")
+            .annotate(total=Sum("quantidade"))
+            .values("total")
+        )
+        Produto.objects.filter(pk__in=pks).update(
+            estoque=F("estoque") - Coalesce(Subquery(reservado), 0)
+        )
+        invalidar_produtos(pks)
+        # bulk_create não dispara post_save, então o índice de busca é
+        # atualizado aqui para o lote inteiro.
+        backend = obter_backend_busca()
+        if backend is not None:
+            backend.indexar(pks)
+    return len(produtos)
+
+
+def importar(registros, tamanho_lote: int = None) -> dict:
+    """Faz o upsert de produtos por ``sku`` em lotes, sem abortar por erros.
+
+    Cada registro é validado isoladamente; os inválidos entram no relatório
+    e os demais são gravados com um ``INSERT ... ON CONFLICT`` por lote.
+
+    ``estoque`` é o total disponível do produto: o valor gravado desconta as
+    reservas ativas de carrinhos (veja ``_gravar_lote``).
+
+    Um SKU repetido dentro do mesmo lote é gravado uma vez, com a última
+    ocorrência; as anteriores contam em ``duplicados`` e são listadas em
+    ``linhas_duplicadas`` (até ``IMPORTACAO_MAX_ERROS``). Só o lote corrente
+    fica em memória: um SKU repetido em lotes diferentes é gravado de novo,
+    a última gravação prevalece, e cada uma conta em ``gravados``.
+    ``processados`` é sempre ``gravados + duplicados + com_erro``.
+    """
+    tamanho_lote = tamanho_lote or getattr(settings, "IMPORTACAO_TAMANHO_LOTE", 1000)
+    max_erros = getattr(settings, "IMPORTACAO_MAX_ERROS", 1000)
+    resultado = {
+        "processados": 0,
+        "gravados": 0,
+        "duplicados": 0,
+        "com_erro": 0,
+        "erros": [],
+        "linhas_duplicadas": [],
+    }
+    # Produto e linha de cada SKU do lote corrente.
+    lote = {}
+    linhas = {}
+
+    for numero, registro in enumerate(registros, start=1):
+        resultado["processados"] += 1
+        if isinstance(registro, Exception):
+            erros = {"non_field_errors": [str(registro)]}
+        else:
+            serializer = ProdutoImportacaoSerializer(data=registro)
+            erros = None if serializer.is_valid() else serializer.errors
+        if erros is not None:
+            resultado["com_erro"] += 1
+            if len(resultado["erros"]) < max_erros:
+                resultado["erros"].append({"linha": numero, "erros": erros})
+            continue
+        produto = Produto(**serializer.validated_data)
+        # Um mesmo SKU repetido no lote não pode ser atualizado duas vezes
+        # pelo mesmo INSERT ... ON CONFLICT; a última ocorrência prevalece.
+        if lote.pop(produto.sku, None) is not None:
+            resultado["duplicados"] += 1
+            if len(resultado["linhas_duplicadas"]) < max_erros:
+                resultado["linhas_duplicadas"].append(
+                    {
+                        "linha": linhas[produto.sku],
+                        "sku": produto.sku,
+                        "substituida_pela_linha": numero,
+                    }
+                )
+        lote[produto.sku] = produto
+        linhas[produto.sku] = numero
+        if len(lote) >= tamanho_lote:
+            resultado["gravados"] += _gravar_lote(lote)
+            lote = {}
+            linhas = {}
+
+    resultado["gravados"] += _gravar_lote(lote)
+    return resultado
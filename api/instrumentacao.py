@@ -0,0 +1,225 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+LIMITES_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+LIMITES_CONSULTAS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500]
+
+_coleta_atual = contextvars.ContextVar("coleta_instrumentacao", default=None)
+
+
+class Coleta:
+    def __init__(self):
+        self.tempos = {"db": 0.0, "http": 0.0, "serializer": 0.0}
+        self.contagens = {"db": 0, "http": 0}
+        self._profundidade_serializer = 0
+
+    def adicionar(self, tipo: str, segundos: float):
+        self.tempos[tipo] += segundos
+        if tipo in self.contagens:
+            self.contagens[tipo] += 1
+
+
+@contextmanager
+def medir(tipo: str):
+    coleta = _coleta_atual.get()
+    if coleta is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        coleta.adicionar(tipo, time.perf_counter() - inicio)
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    with medir("db"):
+        return execute(sql, params, many, context)
+
+
+def _instalar_medicao(connection, **kwargs):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+def _instrumentar_conexoes():
+    # O wrapper fica instalado em cada conexão e só mede quando há uma coleta
+    # no contexto. Instalá-lo a cada request não serviria às views async: o
+    # ORM assíncrono roda as consultas em outra thread, com outra conexão, e
+    # só o contexto (com a coleta) é levado para lá.
+    connection_created.connect(_instalar_medicao, dispatch_uid="instrumentacao")
+    for connection in connections.all(initialized_only=True):
+        _instalar_medicao(connection)
+
+
+class Histograma:
+    def __init__(self, limites: list):
+        self.limites = limites
+        self.baldes = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.quantidade = 0
+
+    def observar(self, valor: float):
+        self.baldes[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.quantidade += 1
+
+    def para_dict(self) -> dict:
+        baldes = {}
+        acumulado = 0
+        for limite, quantidade in zip(self.limites + ["+Inf"], self.baldes):
+            acumulado += quantidade
+            baldes[str(limite)] = acumulado
+        return {"quantidade": self.quantidade, "soma": self.soma, "baldes": baldes}
+
+
+class Registro:
+    """Métricas agregadas por view, mantidas em memória em cada processo."""
+
+    METRICAS = {
+        "total_ms": LIMITES_MS,
+        "db_ms": LIMITES_MS,
+        "db_consultas": LIMITES_CONSULTAS,
+        "http_ms": LIMITES_MS,
+        "http_chamadas": LIMITES_CONSULTAS,
+        "serializer_ms": LIMITES_MS,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observar(self, view: str, valores: dict):
+        with self._lock:
+            histogramas = self._views.get(view)
+            if histogramas is None:
+                histogramas = {
+                    nome: Histograma(limites) for nome, limites in self.METRICAS.items()
+                }
+                self._views[view] = histogramas
+            for nome, valor in valores.items():
+                histogramas[nome].observar(valor)
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                view: {nome: h.para_dict() for nome, h in histogramas.items()}
+                for view, histogramas in self._views.items()
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._views.clear()
+
+
+registro = Registro()
+
+
+def instrumentacao_ativa() -> bool:
+    return getattr(settings, "INSTRUMENTACAO_ATIVA", False)
+
+
+def _instrumentar_serializers():
+    from rest_framework import serializers
+
+    for classe in (serializers.Serializer, serializers.ListSerializer):
+        original = classe.to_representation
+        if getattr(original, "_instrumentado", False):
+            continue
+
+        def to_representation(self, instance, _original=original):
+            coleta = _coleta_atual.get()
+            if coleta is None or coleta._profundidade_serializer:
+                return _original(self, instance)
+            coleta._profundidade_serializer += 1
+            inicio = time.perf_counter()
+            try:
+                return _original(self, instance)
+            finally:
+                coleta._profundidade_serializer -= 1
+                coleta.adicionar("serializer", time.perf_counter() - inicio)
+
+        to_representation._instrumentado = True
+        classe.to_representation = to_representation
+
+
+class InstrumentacaoMiddleware:
+    """Mede tempo, consultas ao banco, chamadas HTTP externas e serialização.
+
+    Só entra na pilha de middlewares com ``INSTRUMENTACAO_ATIVA = True``;
+    caso contrário o Django descarta a classe na inicialização.
+
+    Atende tanto WSGI quanto ASGI: numa pilha assíncrona as views async
+    (``api.views_async``) rodam direto no event loop, sem serem empurradas
+    para uma thread por causa deste middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not instrumentacao_ativa():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+        _instrumentar_serializers()
+        _instrumentar_conexoes()
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        coleta = Coleta()
+        token = _coleta_atual.set(coleta)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - inicio
+            _coleta_atual.reset(token)
+        return self._registrar(request, response, coleta, total)
+
+    async def __acall__(self, request):
+        coleta = Coleta()
+        token = _coleta_atual.set(coleta)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            total = time.perf_counter() - inicio
+            _coleta_atual.reset(token)
+        return self._registrar(request, response, coleta, total)
+
+    def _registrar(self, request, response, coleta, total):
+        response["Server-Timing"] = ", ".join(
+            [
+                f"total;dur={total * 1000:.2f}",
+                f'db;dur={coleta.tempos["db"] * 1000:.2f};desc="{coleta.contagens["db"]} consultas"',
+                f'http;dur={coleta.tempos["http"] * 1000:.2f};desc="{coleta.contagens["http"]} chamadas"',
+                f'serializer;dur={coleta.tempos["serializer"] * 1000:.2f}',
+            ]
+        )
+        resolver_match = getattr(request, "resolver_match", None)
+        view = resolver_match.view_name if resolver_match else "nao_resolvida"
+        registro.observar(
+            f"{request.method} {view}",
+            {
+                "total_ms": total * 1000,
+                "db_ms": coleta.tempos["db"] * 1000,
+                "db_consultas": coleta.contagens["db"],
+                "http_ms": coleta.tempos["http"] * 1000,
+                "http_chamadas": coleta.contagens["http"],
+                "serializer_ms": coleta.tempos["serializer"] * 1000,
+            },
+        )
+        return response
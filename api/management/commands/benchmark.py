@@ -0,0 +1,107 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria um banco descartável com dados sintéticos e mede o fluxo de compra "
+        "(login → produtos → detalhe → carrinho → pedido → cancelamento)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--produtos", type=int, default=1000)
+        parser.add_argument("--usuarios", type=int, default=50)
+        parser.add_argument("--avaliacoes", type=int, default=10000)
+        parser.add_argument("--carrinhos", type=int, default=2000)
+        parser.add_argument("--pedidos", type=int, default=1000)
+        parser.add_argument("--iteracoes", type=int, default=100)
+        parser.add_argument("--concorrencia", type=int, default=1)
+        parser.add_argument("--semente", type=int, default=0)
+        parser.add_argument(
+            "--comparar-sqlite",
+            action="store_true",
+            help=(
+                "Roda o fluxo duas vezes, com o SQLite sem ajustes e com "
+                "settings.SQLITE, para comparar a concorrência de escrita."
+            ),
+        )
+        parser.add_argument(
+            "--serializacao",
+            action="store_true",
+            help=(
+                "Em vez do fluxo de compra, mede linhas por segundo das "
+                "listagens com o ModelSerializer e com a serialização rápida."
+            ),
+        )
+        parser.add_argument("--linhas", type=int, default=1000)
+        parser.add_argument(
+            "--saida", help="Arquivo JSON onde o resultado será gravado."
+        )
+
+    def medir(self, options) -> dict:
+        nome_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(**benchmark.CONFIGURACOES_STUB):
+                benchmark.semear(
+                    produtos=options["produtos"],
+                    usuarios=options["usuarios"],
+                    avaliacoes=options["avaliacoes"],
+                    carrinhos=options["carrinhos"],
+                    pedidos=options["pedidos"],
+                    semente=options["semente"],
+                )
+                if options["serializacao"]:
+                    resultado = benchmark.medir_serializacao(options["linhas"])
+                else:
+                    resultado = benchmark.executar(
+                        iteracoes=options["iteracoes"],
+                        concorrencia=options["concorrencia"],
+                        semente=options["semente"],
+                    )
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+        return resultado
+
+    def handle(self, *args, **options):
+        if options["comparar_sqlite"]:
+            if connection.vendor != "sqlite":
+                raise CommandError("--comparar-sqlite só se aplica ao SQLite.")
+            resultado = {}
+            for nome, sqlite in (
+                ("padrao", benchmark.SQLITE_PADRAO),
+                ("configurado", settings.SQLITE),
+            ):
+                with override_settings(SQLITE=sqlite):
+                    resultado[nome] = self.medir(options)
+                resultado[nome]["sqlite"] = sqlite
+        else:
+            resultado = self.medir(options)
+
+        resultado["configuracao"] = {
+            chave: options[chave]
+            for chave in (
+                "produtos",
+                "usuarios",
+                "avaliacoes",
+                "carrinhos",
+                "pedidos",
+                "iteracoes",
+                "concorrencia",
+                "semente",
+                "linhas",
+            )
+        }
+        conteudo = json.dumps(resultado, indent=2)
+        if options["saida"]:
+            with open(options["saida"], "w") as arquivo:
+                arquivo.write(conteudo)
+        self.stdout.write(conteudo)
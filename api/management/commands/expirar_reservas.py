@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api import estoque
+
+
+class Command(BaseCommand):
+    help = "Devolve ao estoque as reservas ativas que já passaram da validade."
+
+    def handle(self, *args, **options):
+        total = estoque.expirar()
+        self.stdout.write(
+            self.style.SUCCESS(f"{total} unidade(s) devolvida(s) ao estoque.")
+        )
@@ -0,0 +1,37 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import importacao
+
+
+class Command(BaseCommand):
+    help = "Importa (upsert por SKU) produtos de um arquivo CSV ou JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Caminho do arquivo, ou - para stdin.")
+        parser.add_argument("--formato", choices=["csv", "jsonl"])
+        parser.add_argument("--lote", type=int, default=None)
+
+    def handle(self, *args, **options):
+        arquivo = options["arquivo"]
+        formato = options["formato"]
+        if formato is None:
+            if arquivo.endswith(".csv"):
+                formato = "csv"
+            elif arquivo.endswith((".jsonl", ".ndjson")):
+                formato = "jsonl"
+            else:
+                raise CommandError("Informe --formato para este arquivo.")
+
+        if arquivo == "-":
+            resultado = self.importar(sys.stdin, formato, options["lote"])
+        else:
+            with open(arquivo, encoding="utf-8", newline="") as entrada:
+                resultado = self.importar(entrada, formato, options["lote"])
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    def importar(self, entrada, formato, lote):
+        registros = importacao.ler_registros(entrada, formato)
+        return importacao.importar(registros, tamanho_lote=lote)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import checkout
+
+
+class Command(BaseCommand):
+    help = "Apaga as chaves de idempotência do checkout que já passaram da validade."
+
+    def handle(self, *args, **options):
+        total = checkout.limpar_chaves_idempotencia()
+        self.stdout.write(self.style.SUCCESS(f"{total} chave(s) apagada(s)."))
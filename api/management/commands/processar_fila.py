@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import fila
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de tarefas: processa pedidos e envia notificações."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, help="Tarefas reivindicadas por vez.")
+        parser.add_argument(
+            "--tipo",
+            action="append",
+            dest="tipos",
+            help="Processa só este tipo de tarefa (pode ser repetido).",
+        )
+        parser.add_argument(
+            "--uma-vez",
+            action="store_true",
+            help="Sai assim que não houver mais tarefas disponíveis.",
+        )
+
+    def handle(self, *args, **options):
+        intervalo = getattr(settings, "FILA", {}).get("INTERVALO", 1.0)
+        total = 0
+        try:
+            while True:
+                close_old_connections()
+                processadas = fila.processar_lote(options["lote"], options["tipos"])
+                total += processadas
+                if processadas == 0:
+                    if options["uma_vez"]:
+                        break
+                    time.sleep(intervalo)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"{total} tarefa(s) processada(s)."))
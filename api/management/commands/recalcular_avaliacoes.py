@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Avg,
+    Count,
+    IntegerField,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce
+
+from api.models import AvaliacaoProduto, Produto
+
+
+def recalcular_avaliacoes(produto_model=Produto, avaliacao_model=AvaliacaoProduto):
+    avaliacoes = (
+        avaliacao_model.objects.filter(produto=OuterRef("pk"))
+        .order_by()
+        .values("produto")
+    )
+    quantidade = avaliacoes.annotate(total=Count("id")).values("total")
+    soma = avaliacoes.annotate(total=Sum("nota")).values("total")
+    media = avaliacoes.annotate(total=Avg("nota")).values("total")
+    return produto_model.objects.update(
+        quantidade_avaliacoes=Coalesce(
+            Subquery(quantidade, output_field=IntegerField()), 0
+        ),
+        soma_notas=Coalesce(Subquery(soma, output_field=FloatField()), 0.0),
+        nota_media=Coalesce(Subquery(media, output_field=FloatField()), 0.0),
+    )
+
+
+class Command(BaseCommand):
+    help = "Recalcula a quantidade, a soma e a média das notas de avaliação de cada produto."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = recalcular_avaliacoes()
+        self.stdout.write(
+            self.style.SUCCESS(f"Avaliações recalculadas para {total} produto(s).")
+        )
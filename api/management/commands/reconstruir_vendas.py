@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import vendas
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero as tabelas agregadas de vendas usadas pelo dashboard."
+
+    def handle(self, *args, **options):
+        vendas.reconstruir()
+        self.stdout.write(self.style.SUCCESS("Tabelas de vendas reconstruídas."))
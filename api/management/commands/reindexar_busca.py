@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.busca import obter_backend_busca
+
+
+class Command(BaseCommand):
+    help = "Reconstrói do zero o índice de busca textual de produtos."
+
+    def handle(self, *args, **options):
+        backend = obter_backend_busca()
+        if backend is None:
+            raise CommandError("Não há backend de busca para o banco em uso.")
+        with transaction.atomic(), connection.cursor() as cursor:
+            backend.reconstruir(cursor)
+        self.stdout.write(self.style.SUCCESS("Índice de busca reconstruído."))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def preencher_avaliacoes(apps, schema_editor):
+    Produto = apps.get_model('api', 'Produto')
+    AvaliacaoProduto = apps.get_model('api', 'AvaliacaoProduto')
+    avaliacoes = AvaliacaoProduto.objects.filter(produto=OuterRef('pk')).order_by().values('produto')
+    Produto.objects.update(
+        quantidade_avaliacoes=Coalesce(
+            Subquery(avaliacoes.annotate(total=Count('id')).values('total'), output_field=models.IntegerField()), 0
+        ),
+        soma_notas=Coalesce(
+            Subquery(avaliacoes.annotate(total=Sum('nota')).values('total'), output_field=models.FloatField()), 0.0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='quantidade_avaliacoes',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='soma_notas',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.RunPython(preencher_avaliacoes, migrations.RunPython.noop),
+    ]
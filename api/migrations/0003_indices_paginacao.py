@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_produto_avaliacoes_agregadas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='avaliacaoproduto',
+            index=models.Index(fields=['criado_em', 'id'], name='avaliacao_criado_em_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carrinhocompra',
+            index=models.Index(fields=['criado_em', 'id'], name='carrinho_criado_em_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['criado_em', 'id'], name='pedido_criado_em_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['criado_em', 'id'], name='produto_criado_em_id_idx'),
+        ),
+    ]
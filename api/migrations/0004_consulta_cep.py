@@ -0,0 +1,22 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaCep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cep', models.CharField(max_length=8, unique=True)),
+                ('dados', models.JSONField(null=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
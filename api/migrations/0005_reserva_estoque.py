@@ -0,0 +1,56 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+
+def reservar_carrinhos_existentes(apps, schema_editor):
+    # O estoque dos itens já existentes foi debitado diretamente no produto;
+    # as reservas criadas aqui permitem que ele seja devolvido pelo novo fluxo.
+    CarrinhoCompraItem = apps.get_model('api', 'CarrinhoCompraItem')
+    ReservaEstoque = apps.get_model('api', 'ReservaEstoque')
+    expira_em = timezone.now() + timedelta(seconds=getattr(settings, 'RESERVA_VALIDADE', 900))
+    reservas = []
+    itens = CarrinhoCompraItem.objects.exclude(carrinho__pedido__status='Cancelado').values(
+        'produto_id', 'carrinho_id', 'carrinho__pedido_id', 'quantidade'
+    )
+    for item in itens.iterator():
+        reservas.append(ReservaEstoque(
+            produto_id=item['produto_id'],
+            carrinho_id=item['carrinho_id'],
+            quantidade=item['quantidade'],
+            status='Ativa' if item['carrinho__pedido_id'] is None else 'Confirmada',
+            expira_em=expira_em,
+        ))
+    ReservaEstoque.objects.bulk_create(reservas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_consulta_cep'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.IntegerField()),
+                ('status', models.TextField(choices=[('Ativa', 'Ativa'), ('Confirmada', 'Confirmada'), ('Liberada', 'Liberada'), ('Expirada', 'Expirada')], default='Ativa')),
+                ('lote', models.UUIDField(null=True)),
+                ('expira_em', models.DateTimeField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('carrinho', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservas', to='api.carrinhocompra')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='api.produto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expira_em'], name='reserva_status_expira_idx'), models.Index(fields=['lote'], name='reserva_lote_idx')],
+            },
+        ),
+        migrations.RunPython(reservar_carrinhos_existentes, migrations.RunPython.noop),
+    ]
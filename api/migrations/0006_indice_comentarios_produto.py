@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_reserva_estoque'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentarioproduto',
+            index=models.Index(fields=['produto', 'criado_em', 'id'], name='comentario_produto_criado_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_indice_comentarios_produto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='avaliacaoproduto',
+            index=models.Index(fields=['produto', 'criado_em', 'id'], name='avaliacao_produto_criado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carrinhocompra',
+            index=models.Index(condition=models.Q(('pedido__isnull', True)), fields=['usuario'], name='carrinho_aberto_usuario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', 'status'], name='pedido_usuario_status_idx'),
+        ),
+    ]
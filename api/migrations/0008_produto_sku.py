@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_indices_consultas_frequentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_produto_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidosPorStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.TextField(choices=[('Cancelado', 'Cancelado'), ('Aberto', 'Aberto'), ('Processando', 'Processando'), ('Enviado', 'Enviado'), ('Entregue', 'Entregue')], unique=True)),
+                ('quantidade', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VendaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(unique=True)),
+                ('receita', models.FloatField(default=0.0)),
+                ('pedidos', models.IntegerField(default=0)),
+                ('itens', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VendaProduto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.IntegerField(default=0)),
+                ('receita', models.FloatField(default=0.0)),
+                ('produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='vendas', to='api.produto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-quantidade'], name='venda_produto_quantidade_idx')],
+            },
+        ),
+    ]
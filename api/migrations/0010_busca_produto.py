@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# O DDL fica copiado aqui, e não importado de api.busca, para que mudanças
+# futuras naquele módulo não alterem o que esta migration já aplicou.
+TABELA = 'api_produto_busca'
+
+CRIAR = {
+    'sqlite': [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+        "descricao, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"DELETE FROM {TABELA}",
+        f"INSERT INTO {TABELA} (rowid, descricao) SELECT id, descricao FROM api_produto",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        f"CREATE TABLE IF NOT EXISTS {TABELA} ("
+        "produto_id bigint PRIMARY KEY "
+        "REFERENCES api_produto (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "documento tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {TABELA}_documento_idx "
+        f"ON {TABELA} USING GIN (documento)",
+        f"TRUNCATE {TABELA}",
+        f"INSERT INTO {TABELA} (produto_id, documento) "
+        "SELECT p.id, to_tsvector('portuguese', unaccent(p.descricao)) "
+        "FROM api_produto p",
+    ],
+}
+
+
+def criar_indice_busca(apps, schema_editor):
+    comandos = CRIAR.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for comando in comandos:
+            cursor.execute(comando)
+
+
+def remover_indice_busca(apps, schema_editor):
+    if schema_editor.connection.vendor not in CRIAR:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABELA}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_vendas_agregadas'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:50
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def preencher_nota_media(apps, schema_editor):
+    Produto = apps.get_model('api', 'Produto')
+    Produto.objects.filter(quantidade_avaliacoes__gt=0).update(
+        nota_media=F('soma_notas') / F('quantidade_avaliacoes')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_busca_produto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='nota_media',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.RunPython(preencher_nota_media, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['valor', 'id'], name='produto_valor_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['data_validade', 'id'], name='produto_validade_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['nota_media', 'id'], name='produto_nota_media_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['estoque'], name='produto_estoque_idx'),
+        ),
+    ]
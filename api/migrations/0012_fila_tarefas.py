@@ -0,0 +1,33 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_produto_filtros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=64)),
+                ('dados', models.JSONField(default=dict)),
+                ('status', models.TextField(choices=[('Pendente', 'Pendente'), ('Processando', 'Processando'), ('Concluida', 'Concluida'), ('Falhou', 'Falhou')], default='Pendente')),
+                ('tentativas', models.IntegerField(default=0)),
+                ('max_tentativas', models.IntegerField(default=5)),
+                ('disponivel_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lote', models.UUIDField(null=True)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status__in', ['Pendente', 'Processando'])), fields=['disponivel_em', 'id'], name='tarefa_disponivel_idx'), models.Index(fields=['lote'], name='tarefa_lote_idx')],
+            },
+        ),
+    ]
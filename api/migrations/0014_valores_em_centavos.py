@@ -0,0 +1,68 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:08
+
+import api.fields
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Round
+
+CAMPOS = [
+    ('Produto', 'valor'),
+    ('CarrinhoCompra', 'valor_total'),
+    ('CarrinhoCompraItem', 'valor_produto'),
+    ('CarrinhoCompraItem', 'valor_total'),
+    ('VendaDiaria', 'receita'),
+    ('VendaProduto', 'receita'),
+]
+
+
+def reais_para_centavos(apps, schema_editor):
+    # Roda com as colunas ainda em float; o AlterField seguinte só troca o
+    # tipo para inteiro, com os valores já em centavos.
+    for modelo, campo in CAMPOS:
+        apps.get_model('api', modelo).objects.update(**{campo: Round(F(campo) * 100)})
+
+
+def centavos_para_reais(apps, schema_editor):
+    for modelo, campo in CAMPOS:
+        apps.get_model('api', modelo).objects.update(**{campo: F(campo) / 100.0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_chave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.RunPython(reais_para_centavos, centavos_para_reais),
+        migrations.AlterField(
+            model_name='carrinhocompra',
+            name='valor_total',
+            field=api.fields.CentavosField(),
+        ),
+        migrations.AlterField(
+            model_name='carrinhocompraitem',
+            name='valor_produto',
+            field=api.fields.CentavosField(),
+        ),
+        migrations.AlterField(
+            model_name='carrinhocompraitem',
+            name='valor_total',
+            field=api.fields.CentavosField(),
+        ),
+        migrations.AlterField(
+            model_name='produto',
+            name='valor',
+            field=api.fields.CentavosField(),
+        ),
+        migrations.AlterField(
+            model_name='vendadiaria',
+            name='receita',
+            field=api.fields.CentavosField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='vendaproduto',
+            name='receita',
+            field=api.fields.CentavosField(default=0),
+        ),
+    ]
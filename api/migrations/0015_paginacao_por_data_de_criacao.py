@@ -0,0 +1,61 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_valores_em_centavos'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='avaliacaoproduto',
+            name='avaliacao_criado_em_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='avaliacaoproduto',
+            name='avaliacao_produto_criado_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='carrinhocompra',
+            name='carrinho_criado_em_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='comentarioproduto',
+            name='comentario_produto_criado_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pedido',
+            name='pedido_criado_em_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='produto',
+            name='produto_criado_em_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='avaliacaoproduto',
+            index=models.Index(fields=['atualizado_em', 'id'], name='avaliacao_atualizado_em_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='avaliacaoproduto',
+            index=models.Index(fields=['produto', 'atualizado_em', 'id'], name='avaliacao_produto_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carrinhocompra',
+            index=models.Index(fields=['atualizado_em', 'id'], name='carrinho_atualizado_em_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comentarioproduto',
+            index=models.Index(fields=['produto', 'atualizado_em', 'id'], name='comentario_produto_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['atualizado_em', 'id'], name='pedido_atualizado_em_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['atualizado_em', 'id'], name='produto_atualizado_em_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_paginacao_por_data_de_criacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chaveidempotencia',
+            index=models.Index(fields=['criado_em'], name='chave_idempotencia_criado_idx'),
+        ),
+    ]
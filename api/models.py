@@ -1,15 +1,33 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+from api.fields import CentavosField
+
 
 class Produto(models.Model):
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     descricao = models.TextField(null=False)
-    valor = models.FloatField(null=False)
+    valor = CentavosField(null=False)
     data_validade = models.DateField()
     estoque = models.IntegerField(null=False)
+    quantidade_avaliacoes = models.IntegerField(default=0, editable=False)
+    soma_notas = models.FloatField(default=0.0, editable=False)
+    nota_media = models.FloatField(default=0.0, editable=False)
     criado_em = models.DateTimeField(auto_now=True)
     atualizado_em = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["atualizado_em", "id"], name="produto_atualizado_em_id_idx"
+            ),
+            models.Index(fields=["valor", "id"], name="produto_valor_id_idx"),
+            models.Index(fields=["data_validade", "id"], name="produto_validade_id_idx"),
+            models.Index(fields=["nota_media", "id"], name="produto_nota_media_id_idx"),
+            models.Index(fields=["estoque"], name="produto_estoque_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.descricao} - {self.valor}"
 
@@ -32,9 +50,17 @@ class Pedido(models.Model):
     criado_em = models.DateTimeField(auto_now=True)
     atualizado_em = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["atualizado_em", "id"], name="pedido_atualizado_em_id_idx"
+            ),
+            models.Index(fields=["usuario", "status"], name="pedido_usuario_status_idx"),
+        ]
+
 
 class CarrinhoCompra(models.Model):
-    valor_total = models.FloatField(null=False)
+    valor_total = CentavosField(null=False)
     pedido = models.ForeignKey(
         Pedido, on_delete=models.CASCADE, null=True, related_name="carrinhos"
     )
@@ -47,6 +73,18 @@ class CarrinhoCompra(models.Model):
     criado_em = models.DateTimeField(auto_now=True)
     atualizado_em = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["atualizado_em", "id"], name="carrinho_atualizado_em_id_idx"
+            ),
+            models.Index(
+                fields=["usuario"],
+                condition=models.Q(pedido__isnull=True),
+                name="carrinho_aberto_usuario_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.valor_total}"
 
@@ -57,8 +95,8 @@ class CarrinhoCompraItem(models.Model):
     carrinho = models.ForeignKey(
         CarrinhoCompra, on_delete=models.CASCADE, related_name="itens"
     )
-    valor_produto = models.FloatField(null=False)
-    valor_total = models.FloatField(null=False)
+    valor_produto = CentavosField(null=False)
+    valor_total = CentavosField(null=False)
     criado_em = models.DateTimeField(auto_now=True)
     atualizado_em = models.DateTimeField(auto_now_add=True)
 
@@ -81,6 +119,17 @@ class AvaliacaoProduto(models.Model):
     criado_em = models.DateTimeField(auto_now=True)
     atualizado_em = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["atualizado_em", "id"], name="avaliacao_atualizado_em_id_idx"
+            ),
+            models.Index(
+                fields=["produto", "atualizado_em", "id"],
+                name="avaliacao_produto_data_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.nota} - {self.conteudo}"
 
@@ -98,3 +147,119 @@ class ComentarioProduto(models.Model):
     )
     criado_em = models.DateTimeField(auto_now=True)
     atualizado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["produto", "atualizado_em", "id"],
+                name="comentario_produto_data_idx",
+            ),
+        ]
+
+
+class ConsultaCep(models.Model):
+    cep = models.CharField(max_length=8, unique=True)
+    dados = models.JSONField(null=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+
+class ReservaEstoque(models.Model):
+    class Status(models.TextChoices):
+        ATIVA = "Ativa"
+        CONFIRMADA = "Confirmada"
+        LIBERADA = "Liberada"
+        EXPIRADA = "Expirada"
+
+    produto = models.ForeignKey(
+        Produto, on_delete=models.CASCADE, related_name="reservas"
+    )
+    carrinho = models.ForeignKey(
+        CarrinhoCompra, on_delete=models.SET_NULL, null=True, related_name="reservas"
+    )
+    quantidade = models.IntegerField(null=False)
+    status = models.TextField(choices=Status.choices, default=Status.ATIVA)
+    lote = models.UUIDField(null=True)
+    expira_em = models.DateTimeField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "expira_em"], name="reserva_status_expira_idx"),
+            models.Index(fields=["lote"], name="reserva_lote_idx"),
+        ]
+
+
+class VendaDiaria(models.Model):
+    dia = models.DateField(unique=True)
+    receita = CentavosField(default=0)
+    pedidos = models.IntegerField(default=0)
+    itens = models.IntegerField(default=0)
+
+
+class VendaProduto(models.Model):
+    produto = models.OneToOneField(
+        Produto, on_delete=models.CASCADE, related_name="vendas"
+    )
+    quantidade = models.IntegerField(default=0)
+    receita = CentavosField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-quantidade"], name="venda_produto_quantidade_idx"),
+        ]
+
+
+class PedidosPorStatus(models.Model):
+    status = models.TextField(choices=Pedido.Status.choices, unique=True)
+    quantidade = models.IntegerField(default=0)
+
+
+class Tarefa(models.Model):
+    class Status(models.TextChoices):
+        PENDENTE = "Pendente"
+        PROCESSANDO = "Processando"
+        CONCLUIDA = "Concluida"
+        FALHOU = "Falhou"
+
+    tipo = models.CharField(max_length=64)
+    dados = models.JSONField(default=dict)
+    status = models.TextField(choices=Status.choices, default=Status.PENDENTE)
+    tentativas = models.IntegerField(default=0)
+    max_tentativas = models.IntegerField(default=5)
+    disponivel_em = models.DateTimeField(default=timezone.now)
+    lote = models.UUIDField(null=True)
+    erro = models.TextField(blank=True, default="")
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["disponivel_em", "id"],
+                name="tarefa_disponivel_idx",
+                condition=models.Q(status__in=["Pendente", "Processando"]),
+            ),
+            models.Index(fields=["lote"], name="tarefa_lote_idx"),
+        ]
+
+
+class ChaveIdempotencia(models.Model):
+    usuario = models.ForeignKey(
+        get_user_model(), on_delete=models.CASCADE, related_name="chaves_idempotencia"
+    )
+    chave = models.CharField(max_length=255)
+    pedido = models.ForeignKey(
+        Pedido, on_delete=models.CASCADE, null=True, related_name="+"
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["usuario", "chave"], name="chave_idempotencia_usuario_unica"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["criado_em"], name="chave_idempotencia_criado_idx"),
+        ]
@@ -0,0 +1,15 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacao(CursorPagination):
+    # ``atualizado_em`` é o auto_now_add (data de criação) e nunca muda; com o
+    # ``criado_em`` (auto_now) uma edição no meio da navegação movia a linha e
+    # o cursor pulava ou repetia registros.
+    ordering = ("-atualizado_em", "-id")
+    page_size_query_param = "tamanho"
+    max_page_size = getattr(settings, "PAGINACAO_TAMANHO_MAXIMO", 100)
+
+
+class UsuarioCursorPaginacao(CursorPaginacao):
+    ordering = ("-id",)
@@ -0,0 +1,49 @@
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SEPARADORES_LINHA = (
+    ("\u2028".encode(), b"\\u2028"),
+    ("\u2029".encode(), b"\\u2029"),
+)
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """``JSONRenderer`` que gera o JSON compacto com ``orjson``.
+
+    Datas, horas e ``Decimal`` continuam passando pelo encoder do DRF, então a
+    resposta é a mesma. Sem ``orjson`` instalado, com ``indent`` pedido (a API
+    navegável), ``UNICODE_JSON``/``COMPACT_JSON`` desligados ou dados que o
+    ``orjson`` não aceita (inteiros acima de 64 bits), cai no renderer padrão.
+    A única diferença é que ``NaN`` e infinito viram ``null`` em vez de erro.
+    """
+
+    opcoes = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+    )
+
+    def __init__(self):
+        self._padrao = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._padrao, option=self.opcoes)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for separador, escapado in SEPARADORES_LINHA:
+            if separador in ret:
+                ret = ret.replace(separador, escapado)
+        return ret
@@ -0,0 +1,173 @@
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class CampoNaoSuportado(Exception):
+    pass
+
+
+def _data(campo, fuso):
+    if getattr(campo, "format", api_settings.DATE_FORMAT).lower() != ISO_8601:
+        return campo.to_representation
+    return lambda valor: valor.isoformat()
+
+
+def _data_hora(campo, fuso):
+    fuso = getattr(campo, "timezone", fuso)
+    formato = getattr(campo, "format", api_settings.DATETIME_FORMAT)
+    if fuso is None or formato.lower() != ISO_8601:
+        return campo.to_representation
+
+    # O mesmo que enforce_timezone + isoformat do DRF, com o fuso resolvido uma
+    # vez por página em vez de uma vez por valor.
+    def converter(valor):
+        if valor.tzinfo is None:
+            return campo.to_representation(valor)
+        valor = valor.astimezone(fuso).isoformat()
+        if valor.endswith("+00:00"):
+            valor = valor[:-6] + "Z"
+        return valor
+
+    return converter
+
+
+def _decimal(campo, fuso):
+    coerce = getattr(campo, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    if coerce or campo.decimal_places is None:
+        return campo.to_representation
+    # Valores lidos de um campo com as mesmas casas decimais já vêm
+    # quantizados; só os demais passam pelo quantize do DRF.
+    expoente = -campo.decimal_places
+
+    def converter(valor):
+        if valor.as_tuple().exponent == expoente:
+            return valor
+        return campo.to_representation(valor)
+
+    return converter
+
+
+# Ordem importa: subclasses antes das classes base.
+CONVERSORES = [
+    (serializers.PrimaryKeyRelatedField, lambda campo, fuso: None),
+    (serializers.ChoiceField, lambda campo, fuso: None),
+    (serializers.BooleanField, lambda campo, fuso: bool),
+    (serializers.IntegerField, lambda campo, fuso: int),
+    (serializers.FloatField, lambda campo, fuso: float),
+    (serializers.DecimalField, _decimal),
+    (serializers.DateTimeField, _data_hora),
+    (serializers.DateField, _data),
+    (serializers.CharField, lambda campo, fuso: str),
+]
+
+
+def _conversor(campo, fuso):
+    if isinstance(campo, serializers.SerializerMethodField):
+        raise CampoNaoSuportado(campo.field_name)
+    if isinstance(campo, serializers.RelatedField) and not isinstance(
+        campo, serializers.PrimaryKeyRelatedField
+    ):
+        raise CampoNaoSuportado(campo.field_name)
+    if isinstance(campo, serializers.PrimaryKeyRelatedField) and campo.pk_field:
+        raise CampoNaoSuportado(campo.field_name)
+    if isinstance(campo, serializers.BaseSerializer):
+        raise CampoNaoSuportado(campo.field_name)
+    if campo.source == "*" or "." in campo.source:
+        raise CampoNaoSuportado(campo.field_name)
+    for tipo, fabrica in CONVERSORES:
+        if isinstance(campo, tipo):
+            return fabrica(campo, fuso)
+    return campo.to_representation
+
+
+class CodificadorLinhas:
+    """Serializa linhas de ``values_list`` com a saída de um ``ModelSerializer``.
+
+    Os campos do serializer viram uma lista de conversores, um por coluna,
+    montada uma vez por página (o fuso horário corrente pode mudar entre
+    requisições); cada linha é então só um dict montado a partir da tupla,
+    sem instanciar o model nem passar por ``get_attribute`` e
+    ``to_representation`` de cada campo. O resultado é igual a
+    ``serializer_class(instancias, many=True).data``.
+
+    Só serializers de leitura simples são aceitos: campos do próprio model e
+    chaves estrangeiras como pk. Métodos, campos aninhados e ``source`` com
+    ponto levantam ``CampoNaoSuportado``.
+    """
+
+    def __init__(self, serializer_class):
+        self.campos = [
+            campo
+            for campo in serializer_class().fields.values()
+            if not campo.write_only
+        ]
+        # Falha já aqui se o serializer tiver campo não suportado.
+        self._conversores()
+        self.nomes = [campo.field_name for campo in self.campos]
+        self.colunas = [campo.source for campo in self.campos]
+
+    def _conversores(self) -> list:
+        fuso = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [_conversor(campo, fuso) for campo in self.campos]
+
+    def consultar(self, queryset):
+        # Tuplas nomeadas: a paginação por cursor lê a posição da última linha
+        # com getattr, como faria com uma instância.
+        return queryset.values_list(*self.colunas, named=True)
+
+    def codificar(self, linhas) -> list:
+        nomes = self.nomes
+        conversores = self._conversores()
+        return [
+            {
+                nome: valor
+                if conversor is None or valor is None
+                else conversor(valor)
+                for nome, conversor, valor in zip(nomes, conversores, linha)
+            }
+            for linha in linhas
+        ]
+
+
+_codificadores = {}
+_codificadores_lock = threading.Lock()
+
+
+def obter_codificador(serializer_class) -> CodificadorLinhas:
+    with _codificadores_lock:
+        if serializer_class not in _codificadores:
+            _codificadores[serializer_class] = CodificadorLinhas(serializer_class)
+        return _codificadores[serializer_class]
+
+
+def serializacao_rapida_ativa() -> bool:
+    return getattr(settings, "SERIALIZACAO_RAPIDA", True)
+
+
+class ListagemRapidaMixin:
+    """Troca o ``list`` do viewset pela serialização via ``CodificadorLinhas``.
+
+    Filtros, ordenação e paginação continuam os do viewset; só a leitura das
+    linhas e a serialização mudam. Com ``settings.SERIALIZACAO_RAPIDA`` falso
+    o ``list`` padrão do DRF é usado.
+    """
+
+    def listar_rapido(self, queryset, serializer_class):
+        codificador = obter_codificador(serializer_class)
+        linhas = codificador.consultar(queryset)
+        pagina = self.paginate_queryset(linhas)
+        if pagina is not None:
+            return self.get_paginated_response(codificador.codificar(pagina))
+        return Response(codificador.codificar(linhas))
+
+    def list(self, request, *args, **kwargs):
+        if not serializacao_rapida_ativa():
+            return super().list(request, *args, **kwargs)
+        return self.listar_rapido(
+            self.filter_queryset(self.get_queryset()), self.get_serializer_class()
+        )
@@ -1,6 +1,6 @@
-import requests
 from rest_framework import serializers
 
+from api import estoque, fila, vendas
 from api.models import (
     ComentarioProduto,
     Pedido,
@@ -8,16 +8,28 @@ from api.models import (
     CarrinhoCompraItem,
     CarrinhoCompra,
     AvaliacaoProduto,
+    ReservaEstoque,
 )
+from api.checkout import recalcular_totais
+from api.cotacao import obter_provedor_cotacao
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q, prefetch_related_objects
 
 
 class ProdutoSerializer(serializers.ModelSerializer):
+    # A média sai como texto com duas casas, igual na listagem e no detalhe.
+    nota_media = serializers.DecimalField(
+        max_digits=3, decimal_places=2, coerce_to_string=True, read_only=True
+    )
+
     class Meta:
         model = Produto
-        fields = "__all__"
+        # quantidade_avaliacoes e soma_notas só existem para manter nota_media
+        # atualizada (api.signals); não fazem parte da API.
+        exclude = ["quantidade_avaliacoes", "soma_notas"]
 
 
 class ComentarioProdutoSerializer(serializers.ModelSerializer):
@@ -26,28 +38,54 @@ class ComentarioProdutoSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class ProdutoDetalhadoSerializer(serializers.ModelSerializer):
-    nota_media = serializers.SerializerMethodField(read_only=True)
+class ProdutoDetalhadoSerializer(ProdutoSerializer):
+    quantidade_comentarios = serializers.SerializerMethodField(read_only=True)
     comentarios = serializers.SerializerMethodField(read_only=True)
 
-    class Meta:
-        model = Produto
-        fields = "__all__"
+    class Meta(ProdutoSerializer.Meta):
+        pass
+
+    @classmethod
+    def carregar_varios(cls, produto_ids):
+        """Produtos com contagem e comentários recentes já carregados.
+
+        Duas consultas para qualquer quantidade de produtos, em vez de duas
+        por produto nos métodos abaixo.
+        """
+        recentes = getattr(settings, "PRODUTO_COMENTARIOS_RECENTES", 5)
+        return (
+            Produto.objects.filter(pk__in=produto_ids)
+            .annotate(total_comentarios=Count("comentarios"))
+            .prefetch_related(
+                Prefetch(
+                    "comentarios",
+                    queryset=ComentarioProduto.objects.order_by(
+                        "-atualizado_em", "-id"
+                    )[:recentes],
+                    to_attr="comentarios_recentes",
+                )
+            )
+        )
 
-    def get_nota_media(self, obj):
-        avaliacoes = AvaliacaoProduto.objects.filter(produto=obj)
-        if len(avaliacoes) < 1:
-            media = 0.0
-        else:
-            media = sum([av.nota for av in avaliacoes]) / len(avaliacoes)
-        return "{:.2f}".format(media)
+    def get_quantidade_comentarios(self, obj):
+        if hasattr(obj, "total_comentarios"):
+            return obj.total_comentarios
+        return ComentarioProduto.objects.filter(produto=obj).count()
 
     def get_comentarios(self, obj):
-        comentarios = ComentarioProduto.objects.filter(produto=obj)
+        if hasattr(obj, "comentarios_recentes"):
+            comentarios = obj.comentarios_recentes
+        else:
+            recentes = getattr(settings, "PRODUTO_COMENTARIOS_RECENTES", 5)
+            comentarios = ComentarioProduto.objects.filter(produto=obj).order_by(
+                "-atualizado_em", "-id"
+            )[:recentes]
         return ComentarioProdutoSerializer(comentarios, many=True).data
 
 
 class CarrinhoComprasItemSerializer(serializers.ModelSerializer):
+    produto = serializers.IntegerField(source="produto_id")
+
     class Meta:
         model = CarrinhoCompraItem
         fields = "__all__"
@@ -61,7 +99,6 @@ class CarrinhoComprasItemSerializer(serializers.ModelSerializer):
 class CarrinhoComprasAtualSerializer(serializers.ModelSerializer):
     itens = serializers.SerializerMethodField()
     total_dolar = serializers.SerializerMethodField()
-    CHAVE_API = "c94b00ef414eb7272d1bcca0"
 
     class Meta:
         model = CarrinhoCompra
@@ -75,13 +112,8 @@ class CarrinhoComprasAtualSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_total_dolar(self, obj: CarrinhoCompra):
-        url = f"https://v6.exchangerate-api.com/v6/{self.CHAVE_API}/latest/BRL"
-
-        response = requests.get(url)
-
-        data = response.json()
-        cotacao = data.get("conversion_rates").get("USD")
-        total_outra_moeda = obj.valor_total * cotacao
+        cotacao = self.context.get("cotacao") or obter_provedor_cotacao().obter()
+        total_outra_moeda = float(obj.valor_total) * cotacao
         return total_outra_moeda
 
 
@@ -95,96 +127,84 @@ class CarrinhoComprasSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         itens_data = validated_data.pop("itens")
-        carrinho_existente = CarrinhoCompra.objects.filter(
-            Q(usuario=validated_data["usuario"]) and Q(pedido=None)
-        ).first()
-        if carrinho_existente is not None:
-            itens_carrinho_existente: list[
-                CarrinhoCompraItem
-            ] = CarrinhoCompraItem.objects.filter(carrinho=carrinho_existente).all()
-            for item in itens_carrinho_existente:
-                item.produto.estoque += item.quantidade
-                item.produto.save()
-            carrinho_existente.delete()
-        carrinho = CarrinhoCompra.objects.create(valor_total=0.00, **validated_data)
-        itens = []
-        valor_total_carrinho = 0.00
-        for item_data in itens_data:
-            quantidade = item_data["quantidade"]
-            produto = item_data["produto"]
+        with transaction.atomic():
+            carrinho_existente = CarrinhoCompra.objects.filter(
+                Q(usuario=validated_data["usuario"]) & Q(pedido=None)
+            ).first()
             if carrinho_existente is not None:
-                produto.refresh_from_db()
-            if quantidade > produto.estoque:
-                raise serializers.ValidationError(
-                    {
-                        "itens": [
-                            {
-                                "produto": int(produto.id),
-                                "quantidade": int(quantidade),
-                                "detail": f"Produto não possui estoque",
-                                "estoque_disponivel": int(produto.estoque),
-                            }
-                        ]
-                    }
-                )
-            valor_total_item = quantidade * produto.valor
-            valor_total_carrinho += valor_total_item
-            item = CarrinhoCompraItem.objects.create(
-                carrinho=carrinho,
-                valor_total=valor_total_item,
-                valor_produto=produto.valor,
-                **item_data,
-            )
-            itens.append(item)
-            produto.estoque -= quantidade
-            produto.save()
-        carrinho.valor_total = valor_total_carrinho
-        carrinho.save()
-        carrinho.itens.set(itens)
-        return carrinho
+                estoque.liberar(ReservaEstoque.objects.filter(carrinho=carrinho_existente))
+                carrinho_existente.delete()
+            carrinho = CarrinhoCompra.objects.create(valor_total=0.00, **validated_data)
+            return self._salvar_itens(carrinho, itens_data)
 
     def update(self, carrinho: CarrinhoCompra, validated_data):
         itens_data = validated_data.pop("itens")
+        with transaction.atomic():
+            estoque.liberar(ReservaEstoque.objects.filter(carrinho=carrinho))
+            CarrinhoCompraItem.objects.filter(carrinho=carrinho).delete()
+            return self._salvar_itens(carrinho, itens_data)
+
+    def _salvar_itens(self, carrinho: CarrinhoCompra, itens_data):
+        quantidades = {}
+        for item_data in itens_data:
+            produto_id = item_data["produto_id"]
+            quantidades[produto_id] = (
+                quantidades.get(produto_id, 0) + item_data["quantidade"]
+            )
+
+        produtos = Produto.objects.select_for_update().in_bulk(list(quantidades))
+        nao_encontrados = [pk for pk in quantidades if pk not in produtos]
+        if nao_encontrados:
+            raise serializers.ValidationError(
+                {
+                    "itens": [
+                        {"produto": int(pk), "detail": "Produto não encontrado"}
+                        for pk in nao_encontrados
+                    ]
+                }
+            )
+        self._validar_estoque(produtos, quantidades)
+
         itens = []
-        valor_total_carrinho = 0.00
-        instance_itens = CarrinhoCompraItem.objects.filter(carrinho=carrinho).all()
-        for item in instance_itens:
-            item.produto.estoque += item.quantidade
-            item.produto.save()
-            item.delete()
         for item_data in itens_data:
-            quantidade = item_data["quantidade"]
-            produto: Produto = item_data["produto"]
-            produto.refresh_from_db()
-            if quantidade > produto.estoque:
-                raise serializers.ValidationError(
-                    {
-                        "itens": [
-                            {
-                                "produto": int(produto.id),
-                                "quantidade": int(quantidade),
-                                "detail": f"Produto não possui estoque",
-                                "estoque_disponivel": int(produto.estoque),
-                            }
-                        ]
-                    }
+            produto = produtos[item_data["produto_id"]]
+            itens.append(
+                CarrinhoCompraItem(
+                    carrinho=carrinho,
+                    produto=produto,
+                    quantidade=item_data["quantidade"],
+                    valor_total=item_data["quantidade"] * produto.valor,
+                    valor_produto=produto.valor,
                 )
-            valor_total_item = quantidade * produto.valor
-            valor_total_carrinho += valor_total_item
-            item = CarrinhoCompraItem.objects.create(
-                carrinho=carrinho,
-                valor_total=valor_total_item,
-                valor_produto=produto.valor,
-                **item_data,
             )
-            itens.append(item)
-            produto.estoque -= quantidade
-            produto.save()
-        carrinho.valor_total = valor_total_carrinho
-        carrinho.save()
-        carrinho.itens.set(itens)
+        CarrinhoCompraItem.objects.bulk_create(itens)
+
+        try:
+            estoque.reservar(quantidades, carrinho=carrinho)
+        except estoque.EstoqueInsuficiente as exc:
+            self._validar_estoque(Produto.objects.in_bulk(exc.produtos), quantidades)
+            raise serializers.ValidationError(
+                {"detail": "Estoque alterado durante a operação."}
+            )
+
+        recalcular_totais([carrinho.pk])
+        carrinho.refresh_from_db(fields=["valor_total"])
         return carrinho
 
+    def _validar_estoque(self, produtos, quantidades):
+        erros = [
+            {
+                "produto": int(produto.id),
+                "quantidade": int(quantidades[produto.id]),
+                "detail": f"Produto não possui estoque",
+                "estoque_disponivel": int(produto.estoque),
+            }
+            for produto in produtos.values()
+            if quantidades[produto.id] > produto.estoque
+        ]
+        if erros:
+            raise serializers.ValidationError({"itens": erros})
+
 
 class PedidoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -194,14 +214,19 @@ class PedidoSerializer(serializers.ModelSerializer):
 
 class PedidoDetalhadoSerializer(serializers.ModelSerializer):
     carrinhos = serializers.SerializerMethodField()
+    PREFETCH_RELATED = ["carrinhos__itens"]
 
     class Meta:
         model = Pedido
         fields = "__all__"
 
+    @classmethod
+    def carregar(cls, pedido: Pedido):
+        prefetch_related_objects([pedido], *cls.PREFETCH_RELATED)
+        return cls(pedido)
+
     def get_carrinhos(self, obj):
-        carrinhos = CarrinhoCompra.objects.filter(pedido__id=obj.id).all()
-        carrinhos_serializer = CarrinhoComprasSerializer(carrinhos, many=True)
+        carrinhos_serializer = CarrinhoComprasSerializer(obj.carrinhos.all(), many=True)
         return carrinhos_serializer.data
 
 
@@ -214,27 +239,50 @@ class CriarPedidoSerializer(serializers.ModelSerializer):
         model = Pedido
         fields = "__all__"
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            pedido = super().create(validated_data)
+            vendas.registrar_pedido(pedido)
+            # A confirmação das reservas e a mudança para Processando ficam
+            # com o worker (processar_fila), fora do caminho da requisição.
+            fila.enfileirar("processar_pedido", {"pedido_id": pedido.pk})
+        return pedido
+
 
 class AtualizarPedidoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pedido
         fields = ["status"]
 
-    def validate(self, attrs):
-        if self.instance.status == Pedido.Status.CANCELADO:
+    def _verificar(self, pedido: Pedido, status: str):
+        if pedido.status == Pedido.Status.CANCELADO:
             error_message = "Não é possível cancelar um pedido por este endpoint."
-        elif self.instance.status == attrs["status"]:
-            error_message = f"Pedido já se encontra {self.instance.status}."
+        elif pedido.status == status:
+            error_message = f"Pedido já se encontra {pedido.status}."
         else:
             error_message = None
         if error_message is not None:
             raise serializers.ValidationError(detail={"detail": error_message})
+
+    def validate(self, attrs):
+        self._verificar(self.instance, attrs["status"])
         return super().validate(attrs)
 
     def update(self, instance: Pedido, validated_data):
-        instance.status = validated_data["status"]
-        instance.save()
-        return PedidoDetalhadoSerializer(instance).data
+        with transaction.atomic():
+            # O worker muda o status desta mesma linha sob lock; validar e
+            # contabilizar a partir da cópia carregada antes da transação
+            # tiraria o pedido do contador errado em PedidosPorStatus.
+            pedido = Pedido.objects.select_for_update().get(pk=instance.pk)
+            self._verificar(pedido, validated_data["status"])
+            anterior = pedido.status
+            pedido.status = validated_data["status"]
+            pedido.save()
+            vendas.registrar_mudanca_status(pedido, anterior)
+            fila.enfileirar(
+                "notificar_pedido", {"pedido_id": pedido.pk, "status": pedido.status}
+            )
+        return PedidoDetalhadoSerializer.carregar(pedido).data
 
 
 class CancelarPedidoSerializer(serializers.ModelSerializer):
@@ -242,23 +290,40 @@ class CancelarPedidoSerializer(serializers.ModelSerializer):
         model = Pedido
         fields = "__all__"
 
-    def validate(self, attrs):
-        if self.instance.status == Pedido.Status.CANCELADO:
+    def _verificar(self, pedido: Pedido):
+        if pedido.status == Pedido.Status.CANCELADO:
             error_message = "Pedido já se encontra cancelado."
-        elif self.instance.status == Pedido.Status.ENVIADO:
+        elif pedido.status == Pedido.Status.ENVIADO:
             error_message = "Pedido não pode ser cancelado, pois já foi enviado."
-        elif self.instance.status == Pedido.Status.ENTREGUE:
+        elif pedido.status == Pedido.Status.ENTREGUE:
             error_message = "Pedido não pode ser cancelado, pois já foi entregue."
         else:
             error_message = None
         if error_message is not None:
             raise serializers.ValidationError(detail={"detail": error_message})
+
+    def validate(self, attrs):
+        self._verificar(self.instance)
         return super().validate(attrs)
 
     def cancelar(self):
-        self.instance.status = Pedido.Status.CANCELADO
-        self.instance.save()
-        return PedidoDetalhadoSerializer(self.instance).data
+        with transaction.atomic():
+            # Revalida com a linha travada, como em AtualizarPedidoSerializer.
+            pedido = Pedido.objects.select_for_update().get(pk=self.instance.pk)
+            self._verificar(pedido)
+            estoque.liberar(
+                ReservaEstoque.objects.filter(carrinho__pedido=pedido),
+                incluir_confirmadas=True,
+            )
+            anterior = pedido.status
+            pedido.status = Pedido.Status.CANCELADO
+            pedido.save()
+            vendas.registrar_mudanca_status(pedido, anterior)
+            fila.enfileirar(
+                "notificar_pedido", {"pedido_id": pedido.pk, "status": pedido.status}
+            )
+        self.instance = pedido
+        return PedidoDetalhadoSerializer.carregar(pedido).data
 
 
 class UsuarioSerializer(serializers.ModelSerializer):
@@ -301,3 +366,9 @@ class AvaliacaoProdutoSerializer(serializers.ModelSerializer):
                 detail="A nota deve ser menor ou igual a 5.0"
             )
         return obj
+
+    def create(self, validated_data):
+        # Os agregados do produto são atualizados pelo post_save
+        # (api.signals.somar_avaliacao), na mesma transação da avaliação.
+        with transaction.atomic():
+            return super().create(validated_data)
@@ -0,0 +1,103 @@
+from django.contrib.auth.models import User
+from django.db.models import Case, F, When
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from api.autenticacao import invalidar_usuario
+from api.busca import obter_backend_busca
+from api.cache_produto import invalidar_produtos
+from api.models import AvaliacaoProduto, ComentarioProduto, Produto
+
+
+@receiver([post_save, post_delete], sender=Produto)
+def invalidar_cache_produto(sender, instance, **kwargs):
+    invalidar_produtos([instance.pk])
+
+
+@receiver(post_save, sender=Produto)
+def indexar_busca_produto(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "descricao" not in update_fields:
+        return
+    backend = obter_backend_busca()
+    if backend is not None:
+        backend.indexar([instance.pk])
+
+
+@receiver(post_delete, sender=Produto)
+def remover_busca_produto(sender, instance, **kwargs):
+    backend = obter_backend_busca()
+    if backend is not None:
+        backend.remover([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=AvaliacaoProduto)
+@receiver([post_save, post_delete], sender=ComentarioProduto)
+def invalidar_cache_produto_relacionado(sender, instance, **kwargs):
+    invalidar_produtos([instance.produto_id])
+
+
+def _somar_avaliacao(produto_id, quantidade: int, nota: float):
+    # Um único UPDATE relativo: avaliações concorrentes do mesmo produto
+    # não se sobrescrevem, e a média é recalculada a partir dos valores
+    # que a linha tem no momento da escrita.
+    total = F("quantidade_avaliacoes") + quantidade
+    Produto.objects.filter(pk=produto_id).update(
+        quantidade_avaliacoes=total,
+        soma_notas=F("soma_notas") + nota,
+        nota_media=Case(
+            When(
+                quantidade_avaliacoes__gt=-quantidade,
+                then=(F("soma_notas") + nota) / total,
+            ),
+            default=0.0,
+        ),
+    )
+
+
+@receiver(pre_save, sender=AvaliacaoProduto)
+def guardar_avaliacao_anterior(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    instance._avaliacao_anterior = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not {"nota", "produto"} & set(update_fields):
+        return
+    instance._avaliacao_anterior = (
+        AvaliacaoProduto.objects.filter(pk=instance.pk)
+        .values_list("produto_id", "nota")
+        .first()
+    )
+
+
+@receiver(post_save, sender=AvaliacaoProduto)
+def somar_avaliacao(sender, instance, created, raw=False, **kwargs):
+    """Mantém ``quantidade_avaliacoes``, ``soma_notas`` e ``nota_media``.
+
+    Vale para avaliações salvas por qualquer caminho que dispare sinais (API,
+    admin, ORM). ``bulk_create`` e ``QuerySet.update`` não disparam; depois
+    deles rode ``recalcular_avaliacoes``.
+    """
+    if raw:
+        return
+    if created:
+        _somar_avaliacao(instance.produto_id, 1, instance.nota)
+        return
+    anterior = getattr(instance, "_avaliacao_anterior", None)
+    if anterior is None or anterior == (instance.produto_id, instance.nota):
+        return
+    _somar_avaliacao(anterior[0], -1, -anterior[1])
+    _somar_avaliacao(instance.produto_id, 1, instance.nota)
+
+
+@receiver(post_delete, sender=AvaliacaoProduto)
+def subtrair_avaliacao(sender, instance, origin=None, **kwargs):
+    # Apagadas em cascata junto com o produto: não há o que atualizar.
+    if isinstance(origin, Produto) or getattr(origin, "model", None) is Produto:
+        return
+    _somar_avaliacao(instance.produto_id, -1, -instance.nota)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
@@ -0,0 +1,67 @@
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+
+from api import estoque, fila, vendas
+from api.models import Pedido, ReservaEstoque
+
+ASSUNTOS = {
+    Pedido.Status.PROCESSANDO: "Pedido #{id} confirmado",
+    Pedido.Status.ENVIADO: "Pedido #{id} enviado",
+    Pedido.Status.ENTREGUE: "Pedido #{id} entregue",
+    Pedido.Status.CANCELADO: "Pedido #{id} cancelado",
+}
+
+
+def _mudar_status(pedido: Pedido, status: str):
+    anterior = pedido.status
+    pedido.status = status
+    pedido.save()
+    vendas.registrar_mudanca_status(pedido, anterior)
+    fila.enfileirar("notificar_pedido", {"pedido_id": pedido.pk, "status": status})
+
+
+def processar_pedidos(tarefas: list):
+    """Confirma o estoque dos pedidos abertos e os leva para ``Processando``.
+
+    Pedidos que não estão mais abertos (cancelados pelo cliente, ou já
+    processados numa execução anterior desta tarefa) são ignorados. Se as
+    reservas expiraram e o estoque acabou, o pedido é cancelado.
+    """
+    pedidos = Pedido.objects.select_for_update().filter(
+        pk__in=[tarefa.dados["pedido_id"] for tarefa in tarefas],
+        status=Pedido.Status.ABERTO,
+    )
+    for pedido in pedidos:
+        reservas = ReservaEstoque.objects.filter(carrinho__pedido=pedido)
+        try:
+            with transaction.atomic():
+                estoque.confirmar(reservas)
+        except estoque.EstoqueInsuficiente:
+            estoque.liberar(reservas, incluir_confirmadas=True)
+            _mudar_status(pedido, Pedido.Status.CANCELADO)
+        else:
+            _mudar_status(pedido, Pedido.Status.PROCESSANDO)
+
+
+def notificar_pedidos(tarefas: list):
+    pedidos = Pedido.objects.select_related("usuario").in_bulk(
+        [tarefa.dados["pedido_id"] for tarefa in tarefas]
+    )
+    mensagens = []
+    for tarefa in tarefas:
+        pedido = pedidos.get(tarefa.dados["pedido_id"])
+        status = tarefa.dados["status"]
+        if pedido is None or status not in ASSUNTOS:
+            continue
+        if pedido.usuario is None or not pedido.usuario.email:
+            continue
+        mensagens.append(
+            EmailMessage(
+                subject=ASSUNTOS[status].format(id=pedido.pk),
+                body=f"O status do seu pedido #{pedido.pk} agora é {status}.",
+                to=[pedido.usuario.email],
+            )
+        )
+    if mensagens:
+        # Uma única conexão SMTP para o lote inteiro.
+        get_connection(fail_silently=False).send_messages(mensagens)
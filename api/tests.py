@@ -1 +1,1704 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+import requests
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F, Q, Sum
+from django.http import HttpResponse
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import busca, cache_produto, estoque, fila, instrumentacao, vendas
+from api.autenticacao import obter_cache_usuarios
+from api.busca import BACKENDS_PADRAO, obter_backend_busca
+from api.cep import CepIndisponivel, obter_resolvedor_cep
+from api.cotacao import ProvedorCotacao
+from api.instrumentacao import InstrumentacaoMiddleware
+from api.models import (
+    AvaliacaoProduto,
+    CarrinhoCompra,
+    CarrinhoCompraItem,
+    ChaveIdempotencia,
+    ComentarioProduto,
+    ConsultaCep,
+    Pedido,
+    PedidosPorStatus,
+    Produto,
+    ReservaEstoque,
+    Tarefa,
+    VendaDiaria,
+    VendaProduto,
+)
+from api.renderers import JSONRapidoRenderer
+from api.serializers import (
+    AtualizarPedidoSerializer,
+    CancelarPedidoSerializer,
+    PedidoDetalhadoSerializer,
+)
+
+
+def criar_produto(**kwargs):
+    dados = {
+        "descricao": "Produto",
+        "valor": 10.0,
+        "data_validade": "2030-01-01",
+        "estoque": 10,
+    }
+    dados.update(kwargs)
+    return Produto.objects.create(**dados)
+
+
+class ReservaEstoqueTests(TestCase):
+    def setUp(self):
+        self.produto = criar_produto(estoque=5)
+
+    def test_reservar_debita_estoque(self):
+        estoque.reservar({self.produto.pk: 3})
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 2)
+
+    def test_reservar_sem_estoque_nao_altera_nada(self):
+        outro = criar_produto(estoque=1)
+        with self.assertRaises(estoque.EstoqueInsuficiente) as ctx:
+            estoque.reservar({self.produto.pk: 1, outro.pk: 2})
+        self.assertEqual(ctx.exception.produtos, [outro.pk])
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 5)
+        self.assertFalse(ReservaEstoque.objects.exists())
+
+    def test_liberar_devolve_uma_unica_vez(self):
+        estoque.reservar({self.produto.pk: 3})
+        reservas = ReservaEstoque.objects.all()
+        self.assertEqual(estoque.liberar(reservas), 3)
+        self.assertEqual(estoque.liberar(reservas), 0)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 5)
+
+    def test_expirar_e_confirmar_debita_novamente(self):
+        estoque.reservar({self.produto.pk: 4}, validade=timedelta(seconds=-1))
+        self.assertEqual(estoque.expirar(), 4)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 5)
+
+        self.assertEqual(estoque.confirmar(ReservaEstoque.objects.all()), 4)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 1)
+
+    def test_cancelar_pedido_devolve_estoque(self):
+        usuario = User.objects.create_user("comprador", password="senha")
+        client = APIClient()
+        client.force_authenticate(usuario)
+        response = client.post(
+            "/carrinho/adicionar",
+            {"itens": [{"produto": self.produto.pk, "quantidade": 2}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        carrinho = CarrinhoCompra.objects.get()
+        response = client.post(
+            "/pedidos/criar", {"carrinhos": [carrinho.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        fila.processar_lote()
+        pedido = Pedido.objects.get()
+        self.assertEqual(pedido.status, Pedido.Status.PROCESSANDO)
+        self.assertEqual(
+            ReservaEstoque.objects.get().status, ReservaEstoque.Status.CONFIRMADA
+        )
+
+        response = client.delete(f"/pedidos/cancelar/{pedido.pk}")
+        self.assertEqual(response.status_code, 200)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 5)
+
+
+class PedidoDetalhadoConsultasTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.produtos = [criar_produto(descricao=f"Produto {i}") for i in range(5)]
+
+    def criar_pedido(self, carrinhos: int, itens: int) -> Pedido:
+        pedido = Pedido.objects.create(usuario=self.usuario)
+        for _ in range(carrinhos):
+            carrinho = CarrinhoCompra.objects.create(
+                usuario=self.usuario, pedido=pedido, valor_total=0.0
+            )
+            CarrinhoCompraItem.objects.bulk_create(
+                CarrinhoCompraItem(
+                    carrinho=carrinho,
+                    produto=self.produtos[i % len(self.produtos)],
+                    quantidade=1,
+                    valor_produto=10.0,
+                    valor_total=10.0,
+                )
+                for i in range(itens)
+            )
+        return pedido
+
+    def test_consultas_independem_do_tamanho_do_pedido(self):
+        for carrinhos, itens in [(1, 1), (5, 20)]:
+            pedido = self.criar_pedido(carrinhos, itens)
+            with self.assertNumQueries(3):
+                response = self.client.get(f"/pedidos/{pedido.pk}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["carrinhos"]), carrinhos)
+            self.assertEqual(len(response.data["carrinhos"][0]["itens"]), itens)
+
+    def test_carregar_usa_prefetch(self):
+        pedido = self.criar_pedido(4, 10)
+        with self.assertNumQueries(2):
+            data = PedidoDetalhadoSerializer.carregar(pedido).data
+        self.assertEqual(sum(len(c["itens"]) for c in data["carrinhos"]), 40)
+
+
+class CarrinhoConsultasTests(TestCase):
+    """O número de consultas ao gravar um carrinho não depende dos itens."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.produtos = [criar_produto(estoque=100) for _ in range(30)]
+
+    def itens(self, quantidade: int) -> dict:
+        return {
+            "itens": [
+                {"produto": produto.pk, "quantidade": 1}
+                for produto in self.produtos[:quantidade]
+            ]
+        }
+
+    def test_criar_carrinho(self):
+        for quantidade in (1, 5, 30):
+            CarrinhoCompra.objects.all().delete()
+            with self.assertNumQueries(14):
+                response = self.client.post(
+                    "/carrinho/adicionar", self.itens(quantidade), format="json"
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["itens"]), quantidade)
+
+    def test_substituir_carrinho_aberto(self):
+        self.client.post("/carrinho/adicionar", self.itens(30), format="json")
+        for quantidade in (1, 30):
+            with self.assertNumQueries(22):
+                response = self.client.post(
+                    "/carrinho/adicionar", self.itens(quantidade), format="json"
+                )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(CarrinhoCompra.objects.count(), 1)
+        ativas = ReservaEstoque.objects.filter(status=ReservaEstoque.Status.ATIVA)
+        self.assertEqual(ativas.count(), 30)
+
+    def test_atualizar_carrinho(self):
+        self.client.post("/carrinho/adicionar", self.itens(1), format="json")
+        carrinho = CarrinhoCompra.objects.get()
+        for quantidade in (30, 1):
+            with self.assertNumQueries(18):
+                response = self.client.put(
+                    f"/carrinho/atualizar/{carrinho.pk}",
+                    self.itens(quantidade),
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["itens"]), quantidade)
+        self.assertEqual(Produto.objects.filter(estoque=99).count(), 1)
+        self.assertEqual(Produto.objects.filter(estoque=100).count(), 29)
+
+
+@skipUnless(
+    connection.vendor in ("sqlite", "postgresql"), "EXPLAIN verificado só em SQLite/Postgres"
+)
+class PlanoConsultasTests(TestCase):
+    """Garante que as consultas mais frequentes continuam usando seus índices.
+
+    Cada teste roda ``EXPLAIN`` na consulta exatamente como a view/serializer
+    a monta e procura o nome do índice no plano. No Postgres o seq scan é
+    desligado, já que com tabelas de teste vazias ele seria sempre escolhido.
+    Se um teste falhar, o índice foi removido ou a consulta mudou de forma
+    que o banco não consegue mais usá-lo.
+    """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.produto = criar_produto()
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsaIndice(self, queryset, indice: str):
+        plano = queryset.explain()
+        self.assertIn(indice, plano)
+
+    def test_carrinho_aberto_do_usuario(self):
+        self.assertUsaIndice(
+            CarrinhoCompra.objects.filter(Q(usuario=self.usuario) & Q(pedido=None)),
+            "carrinho_aberto_usuario_idx",
+        )
+
+    def test_pedidos_por_usuario_e_status(self):
+        self.assertUsaIndice(
+            Pedido.objects.filter(usuario=self.usuario, status=Pedido.Status.ABERTO),
+            "pedido_usuario_status_idx",
+        )
+
+    def test_avaliacoes_do_produto_por_data(self):
+        self.assertUsaIndice(
+            AvaliacaoProduto.objects.filter(produto=self.produto).order_by(
+                "-atualizado_em", "-id"
+            ),
+            "avaliacao_produto_data_idx",
+        )
+
+    def test_comentarios_recentes_do_produto(self):
+        self.assertUsaIndice(
+            ComentarioProduto.objects.filter(produto=self.produto).order_by(
+                "-atualizado_em", "-id"
+            )[:5],
+            "comentario_produto_data_idx",
+        )
+
+    def test_listagem_paginada_de_produtos(self):
+        self.assertUsaIndice(
+            Produto.objects.order_by("-atualizado_em", "-id")[:20],
+            "produto_atualizado_em_id_idx",
+        )
+
+    def test_produtos_por_nota_minima(self):
+        self.assertUsaIndice(
+            Produto.objects.filter(nota_media__gte=4.0).order_by("-nota_media", "-id")[
+                :20
+            ],
+            "produto_nota_media_id_idx",
+        )
+
+
+def falhar_sempre(tarefas):
+    raise RuntimeError("falha")
+
+
+@override_settings(
+    FILA={
+        "MAX_TENTATIVAS": 2,
+        "ATRASO_BASE": 0,
+        "VISIBILIDADE": 60,
+        "TAREFAS": {
+            "processar_pedido": "api.tarefas.processar_pedidos",
+            "notificar_pedido": "api.tarefas.notificar_pedidos",
+            "falhar": "api.tests.falhar_sempre",
+        },
+    }
+)
+class FilaTarefasTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user(
+            "comprador", email="comprador@example.com", password="senha"
+        )
+
+    def criar_pedido(self, produto) -> Pedido:
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        response = client.post(
+            "/carrinho/adicionar",
+            {"itens": [{"produto": produto.pk, "quantidade": 2}]},
+            format="json",
+        )
+        response = client.post(
+            "/pedidos/criar",
+            {"carrinhos": [response.data["id"]], "usuario": self.usuario.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return Pedido.objects.get(pk=response.data["id"])
+
+    def test_worker_processa_pedido_e_notifica(self):
+        pedido = self.criar_pedido(criar_produto(estoque=5))
+        self.assertEqual(pedido.status, Pedido.Status.ABERTO)
+
+        self.assertEqual(fila.processar_lote(), 1)
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.status, Pedido.Status.PROCESSANDO)
+
+        self.assertEqual(fila.processar_lote(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["comprador@example.com"])
+        self.assertFalse(
+            Tarefa.objects.exclude(status=Tarefa.Status.CONCLUIDA).exists()
+        )
+
+    def test_reservas_expiradas_sem_estoque_cancelam_pedido(self):
+        produto = criar_produto(estoque=2)
+        pedido = self.criar_pedido(produto)
+        estoque.expirar(agora=timezone.now() + timedelta(days=1))
+        Produto.objects.filter(pk=produto.pk).update(estoque=0)
+
+        fila.processar_lote()
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.status, Pedido.Status.CANCELADO)
+
+    def test_tarefa_com_erro_e_repetida_ate_o_limite(self):
+        tarefa = fila.enfileirar("falhar", {})
+        with self.assertLogs("api.fila", "WARNING"):
+            fila.processar_lote()
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, Tarefa.Status.PENDENTE)
+        self.assertEqual(tarefa.tentativas, 1)
+
+        with self.assertLogs("api.fila", "WARNING"):
+            fila.processar_lote()
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, Tarefa.Status.FALHOU)
+        self.assertIn("falha", tarefa.erro)
+
+    def test_tarefa_abandonada_volta_apos_visibilidade(self):
+        fila.enfileirar("notificar_pedido", {"pedido_id": 0, "status": "Enviado"})
+        self.assertEqual(len(fila.reivindicar(10)), 1)
+        self.assertEqual(fila.reivindicar(10), [])
+
+        Tarefa.objects.update(disponivel_em=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(fila.reivindicar(10)), 1)
+
+
+class ClienteCepControlado:
+    def __init__(self):
+        self.enderecos = {"01001000": {"cep": "01001-000"}}
+        self.chamadas = 0
+        self.indisponivel = False
+
+    def buscar(self, cep: str):
+        self.chamadas += 1
+        if self.indisponivel:
+            raise CepIndisponivel()
+        return self.enderecos.get(cep)
+
+
+@override_settings(
+    CEP={"CLIENTE": "api.tests.ClienteCepControlado", "TTL_NEGATIVO": 3600}
+)
+class ConsultaCepTests(TestCase):
+    def setUp(self):
+        self.resolvedor = obter_resolvedor_cep()
+        self.resolvedor.limpar()
+        self.cliente_cep = self.resolvedor.cliente = ClienteCepControlado()
+        usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def consultar(self, cep):
+        return self.client.get(f"/consultas/cep/{cep}")
+
+    def test_segunda_consulta_vem_da_memoria(self):
+        response = self.consultar("01001-000")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"cep": "01001-000"})
+        self.assertTrue(ConsultaCep.objects.filter(cep="01001000").exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.consultar("01001000").data, {"cep": "01001-000"})
+        self.assertEqual(self.cliente_cep.chamadas, 1)
+
+    def test_tabela_atende_sem_chamar_o_servico(self):
+        self.consultar("01001000")
+        self.resolvedor.limpar()
+        self.cliente_cep.indisponivel = True
+        with self.assertNumQueries(1):
+            response = self.consultar("01001000")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cliente_cep.chamadas, 1)
+
+    def test_cep_inexistente_fica_em_cache_ate_o_ttl(self):
+        self.assertEqual(self.consultar("99999999").status_code, 404)
+        self.resolvedor.limpar()
+        self.assertEqual(self.consultar("99999999").status_code, 404)
+        self.assertEqual(self.cliente_cep.chamadas, 1)
+
+        ConsultaCep.objects.filter(cep="99999999").update(
+            atualizado_em=timezone.now() - timedelta(hours=2)
+        )
+        self.resolvedor.limpar()
+        self.cliente_cep.enderecos["99999999"] = {"cep": "99999-999"}
+        self.assertEqual(self.consultar("99999999").status_code, 200)
+        self.assertEqual(self.cliente_cep.chamadas, 2)
+
+    def test_cep_invalido_nao_chama_o_servico(self):
+        self.assertEqual(self.consultar("123").status_code, 404)
+        self.assertEqual(self.cliente_cep.chamadas, 0)
+
+    def test_servico_fora_do_ar(self):
+        self.cliente_cep.indisponivel = True
+        self.assertEqual(self.consultar("01001000").status_code, 503)
+        self.assertFalse(ConsultaCep.objects.exists())
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.produtos = [criar_produto(descricao=f"Produto {i}") for i in range(10)]
+
+    def montar_carrinho(self, itens: int):
+        response = self.client.post(
+            "/carrinho/adicionar",
+            {
+                "itens": [
+                    {"produto": produto.pk, "quantidade": 1}
+                    for produto in self.produtos[:itens]
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_checkout_cria_pedido_com_precos_atuais(self):
+        self.montar_carrinho(2)
+        Produto.objects.filter(pk=self.produtos[0].pk).update(valor=15.0)
+
+        response = self.client.post("/pedidos/checkout")
+        self.assertEqual(response.status_code, 201)
+        pedido = Pedido.objects.get()
+        self.assertEqual(pedido.usuario, self.usuario)
+        carrinho = CarrinhoCompra.objects.get()
+        self.assertEqual(carrinho.pedido, pedido)
+        self.assertEqual(carrinho.valor_total, 25.0)
+        self.assertFalse(
+            ReservaEstoque.objects.exclude(
+                status=ReservaEstoque.Status.CONFIRMADA
+            ).exists()
+        )
+        self.assertEqual(self.client.post("/pedidos/checkout").status_code, 400)
+
+    def test_mesma_chave_de_idempotencia_nao_duplica_pedido(self):
+        self.montar_carrinho(1)
+        primeira = self.client.post("/pedidos/checkout", HTTP_IDEMPOTENCY_KEY="abc")
+        segunda = self.client.post("/pedidos/checkout", HTTP_IDEMPOTENCY_KEY="abc")
+        self.assertEqual(primeira.status_code, 201)
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(primeira.data["id"], segunda.data["id"])
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCIA_VALIDADE=3600)
+    def test_chaves_vencidas_sao_apagadas(self):
+        self.montar_carrinho(1)
+        self.client.post("/pedidos/checkout", HTTP_IDEMPOTENCY_KEY="antiga")
+        self.montar_carrinho(1)
+        self.client.post("/pedidos/checkout", HTTP_IDEMPOTENCY_KEY="recente")
+        ChaveIdempotencia.objects.filter(chave="antiga").update(
+            criado_em=timezone.now() - timedelta(hours=2)
+        )
+        saida = StringIO()
+        call_command("limpar_chaves_idempotencia", stdout=saida)
+        self.assertIn("1 chave(s)", saida.getvalue())
+        self.assertEqual(
+            list(ChaveIdempotencia.objects.values_list("chave", flat=True)),
+            ["recente"],
+        )
+        self.assertEqual(Pedido.objects.count(), 2)
+
+    def test_consultas_independem_do_tamanho_do_carrinho(self):
+        consultas = []
+        for itens in (1, 10):
+            self.montar_carrinho(itens)
+            Produto.objects.update(valor=F("valor") * 2)
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.client.post(
+                    "/pedidos/checkout", HTTP_IDEMPOTENCY_KEY=f"chave-{itens}"
+                )
+            self.assertEqual(response.status_code, 201)
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+
+
+class AutenticacaoCacheTests(TestCase):
+    def setUp(self):
+        obter_cache_usuarios().limpar()
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.admin = User.objects.create_superuser("admin", password="senha")
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.usuario)}"
+        )
+
+    def test_autenticacao_nao_consulta_usuario_apos_primeiro_request(self):
+        self.client.get("/carrinho")
+        # Só a consulta dos carrinhos; nenhum SELECT em auth_user.
+        with self.assertNumQueries(1):
+            resposta = self.client.get("/carrinho")
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_usuario_desativado_deixa_de_autenticar(self):
+        self.assertEqual(self.client.get("/carrinho").status_code, 200)
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.patch(
+                f"/usuarios/{self.usuario.pk}", {"is_active": False}, format="json"
+            )
+        self.assertEqual(self.client.get("/carrinho").status_code, 401)
+
+
+@override_settings(
+    CEP={
+        "CLIENTE": "api.cep.ClienteCepFixo",
+        "OPCOES": {"enderecos": {"01001000": {"cep": "01001-000"}}},
+    },
+    COTACAO={"PROVEDOR": "api.cotacao.CotacaoFixa", "OPCOES": {"valor": 0.2}},
+)
+class ViewsAssincronasTests(TestCase):
+    def setUp(self):
+        obter_cache_usuarios().limpar()
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.usuario)}"}
+        produto = criar_produto()
+        self.carrinho = CarrinhoCompra.objects.create(
+            usuario=self.usuario, valor_total=Decimal("20.00")
+        )
+        CarrinhoCompraItem.objects.create(
+            carrinho=self.carrinho,
+            produto=produto,
+            quantidade=2,
+            valor_produto=Decimal("10.00"),
+            valor_total=Decimal("20.00"),
+        )
+        pedido = Pedido.objects.create(usuario=self.usuario)
+        CarrinhoCompra.objects.create(
+            usuario=self.usuario, valor_total=0, pedido=pedido
+        )
+
+    async def test_cep(self):
+        response = await self.async_client.get(
+            "/async/consultas/cep/01001-000", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"cep": "01001-000"})
+        response = await self.async_client.get(
+            "/async/consultas/cep/99999999", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_carrinho_igual_ao_endpoint_sincrono(self):
+        response = await self.async_client.get("/async/carrinho", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        dados = response.json()
+        self.assertEqual([c["id"] for c in dados], [self.carrinho.pk])
+        self.assertEqual(dados[0]["total_dolar"], 4.0)
+        self.assertEqual(len(dados[0]["itens"]), 1)
+        sincrono = await self.async_client.get("/carrinho", headers=self.headers)
+        self.assertEqual(dados, sincrono.json()["results"])
+
+    async def test_sem_token_ou_token_invalido(self):
+        response = await self.async_client.get("/async/carrinho")
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(
+            "/async/carrinho", headers={"Authorization": "Bearer invalido"}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_usuario_em_cache_nao_vai_para_thread(self):
+        with mock.patch(
+            "api.autenticacao.sync_to_async", wraps=sync_to_async
+        ) as para_thread:
+            await self.async_client.get("/async/carrinho", headers=self.headers)
+            self.assertEqual(para_thread.call_count, 1)
+            response = await self.async_client.get(
+                "/async/carrinho", headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(para_thread.call_count, 1)
+
+    @override_settings(INSTRUMENTACAO_ATIVA=True)
+    def test_instrumentacao_nao_tira_a_view_do_event_loop(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        # Como no ASGIHandler, a pilha é carregada na inicialização, na thread
+        # principal; é lá que a conexão usada pelo ORM assíncrono já existe.
+        middleware = InstrumentacaoMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(self.async_client.get)(
+            "/async/carrinho", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        # Usuário, carrinhos (ORM assíncrono) e itens: todas medidas, mesmo
+        # rodando fora do event loop.
+        self.assertIn('desc="3 consultas"', response["Server-Timing"])
+
+
+class HistogramaTests(SimpleTestCase):
+    def test_baldes_acumulados_incluem_o_limite(self):
+        histograma = instrumentacao.Histograma([1, 5, 10])
+        for valor in (0.5, 1, 3, 5, 7, 50):
+            histograma.observar(valor)
+        self.assertEqual(
+            histograma.para_dict(),
+            {
+                "quantidade": 6,
+                "soma": 66.5,
+                "baldes": {"1": 2, "5": 4, "10": 5, "+Inf": 6},
+            },
+        )
+
+    def test_registro_agrupa_por_view(self):
+        registro = instrumentacao.Registro()
+        valores = dict.fromkeys(registro.METRICAS, 1)
+        registro.observar("GET a", valores)
+        registro.observar("GET a", valores)
+        registro.observar("GET b", valores)
+        resumo = registro.resumo()
+        self.assertEqual(set(resumo), {"GET a", "GET b"})
+        self.assertEqual(set(resumo["GET a"]), set(registro.METRICAS))
+        self.assertEqual(resumo["GET a"]["db_consultas"]["quantidade"], 2)
+        registro.limpar()
+        self.assertEqual(registro.resumo(), {})
+
+
+@override_settings(INSTRUMENTACAO_ATIVA=True)
+class InstrumentacaoTests(TestCase):
+    def setUp(self):
+        instrumentacao.registro.limpar()
+        self.addCleanup(instrumentacao.registro.limpar)
+        self.admin = User.objects.create_superuser("admin", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        criar_produto()
+
+    def test_server_timing_conta_consultas_da_request(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get("/produtos")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(capturadas), 0)
+        self.assertIn(
+            f'desc="{len(capturadas)} consultas"', response["Server-Timing"]
+        )
+
+    def test_metricas_por_view(self):
+        self.client.get("/produtos")
+        self.client.get("/produtos")
+        response = self.client.get("/metricas")
+        self.assertEqual(response.status_code, 200)
+        listagem = response.data["GET produto-list"]
+        self.assertEqual(listagem["total_ms"]["quantidade"], 2)
+        self.assertEqual(listagem["db_consultas"]["baldes"]["+Inf"], 2)
+
+    def test_metricas_so_para_admin(self):
+        usuario = User.objects.create_user("comprador", password="senha")
+        cliente = APIClient()
+        cliente.force_authenticate(usuario)
+        self.assertEqual(cliente.get("/metricas").status_code, 403)
+
+    @override_settings(INSTRUMENTACAO_ATIVA=False)
+    def test_desativada(self):
+        response = self.client.get("/produtos")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(self.client.get("/metricas").status_code, 404)
+
+
+class AvaliacoesAgregadasTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.produto = criar_produto()
+        self.outro = criar_produto()
+
+    def avaliar(self, nota, produto=None):
+        return AvaliacaoProduto.objects.create(
+            produto=produto or self.produto,
+            usuario=self.usuario,
+            nota=nota,
+            conteudo=".",
+        )
+
+    def assertAgregados(self, produto, quantidade, soma, media):
+        produto.refresh_from_db()
+        self.assertEqual(produto.quantidade_avaliacoes, quantidade)
+        self.assertAlmostEqual(produto.soma_notas, soma)
+        self.assertAlmostEqual(produto.nota_media, media)
+
+    def test_avaliacao_pela_api(self):
+        response = self.client.post(
+            f"/produtos/{self.produto.pk}/avaliacao",
+            {"nota": 4.0, "conteudo": "Bom"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.client.post(
+            f"/produtos/{self.produto.pk}/avaliacao",
+            {"nota": 2.0, "conteudo": "Ruim"},
+            format="json",
+        )
+        self.assertAgregados(self.produto, 2, 6.0, 3.0)
+
+    def test_avaliacoes_fora_da_api(self):
+        avaliacao = self.avaliar(5.0)
+        self.avaliar(3.0)
+        self.assertAgregados(self.produto, 2, 8.0, 4.0)
+
+        avaliacao.nota = 1.0
+        avaliacao.save()
+        self.assertAgregados(self.produto, 2, 4.0, 2.0)
+
+        avaliacao.produto = self.outro
+        avaliacao.save()
+        self.assertAgregados(self.produto, 1, 3.0, 3.0)
+        self.assertAgregados(self.outro, 1, 1.0, 1.0)
+
+        avaliacao.delete()
+        self.assertAgregados(self.outro, 0, 0.0, 0.0)
+
+    def test_salvar_sem_mudar_nota_nao_altera_agregados(self):
+        avaliacao = self.avaliar(4.0)
+        avaliacao.conteudo = "Editado"
+        avaliacao.save()
+        avaliacao.save(update_fields=["conteudo"])
+        self.assertAgregados(self.produto, 1, 4.0, 4.0)
+
+    def test_listagem_e_detalhe_expoem_a_mesma_nota(self):
+        self.avaliar(4.0)
+        self.avaliar(5.0)
+        listagem = self.client.get("/produtos").data["results"]
+        detalhe = self.client.get(f"/produtos/{self.produto.pk}").data
+        produto = next(p for p in listagem if p["id"] == self.produto.pk)
+        self.assertEqual(produto["nota_media"], "4.50")
+        self.assertEqual(detalhe["nota_media"], "4.50")
+        for dados in (produto, detalhe):
+            self.assertNotIn("quantidade_avaliacoes", dados)
+            self.assertNotIn("soma_notas", dados)
+
+    def test_recalcular_avaliacoes_corrige_agregados(self):
+        self.avaliar(5.0)
+        self.avaliar(2.0)
+        AvaliacaoProduto.objects.bulk_create(
+            [
+                AvaliacaoProduto(
+                    produto=self.outro, usuario=self.usuario, nota=3.0, conteudo="."
+                )
+            ]
+        )
+        Produto.objects.filter(pk=self.produto.pk).update(
+            quantidade_avaliacoes=99, soma_notas=0.0, nota_media=0.0
+        )
+        saida = StringIO()
+        call_command("recalcular_avaliacoes", stdout=saida)
+        self.assertIn("2 produto(s)", saida.getvalue())
+        self.assertAgregados(self.produto, 2, 7.0, 3.5)
+        self.assertAgregados(self.outro, 1, 3.0, 3.0)
+
+
+class SerializacaoRapidaTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.produto = criar_produto(descricao="Café\u2028moído", valor=Decimal("19.9"))
+        for i in range(4):
+            criar_produto(descricao=f"Produto {i}", sku=f"SKU-{i}", valor=i + 0.5)
+            Pedido.objects.create(usuario=self.usuario if i % 2 else None)
+            AvaliacaoProduto.objects.create(
+                produto=self.produto, usuario=self.usuario, nota=i, conteudo="Bom"
+            )
+
+    def paginas(self, url: str) -> list:
+        corpos = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            corpos.append(response.content)
+            url = response.json()["next"]
+        return corpos
+
+    def test_listagens_iguais_ao_model_serializer(self):
+        for url in (
+            "/produtos?tamanho=2",
+            "/produtos?tamanho=2&ordenar=-valor",
+            "/pedidos?tamanho=2",
+            f"/produtos/{self.produto.pk}/avaliacoes?tamanho=2",
+        ):
+            rapido = self.paginas(url)
+            with override_settings(SERIALIZACAO_RAPIDA=False):
+                padrao = self.paginas(url)
+            self.assertEqual(rapido, padrao, url)
+            self.assertGreater(len(rapido), 1)
+
+    def test_ordenar_de_produto_nao_afeta_listagens_aninhadas(self):
+        ComentarioProduto.objects.create(produto=self.produto, usuario=self.usuario)
+        for url in (
+            f"/produtos/{self.produto.pk}/avaliacoes?ordenar=valor",
+            f"/produtos/{self.produto.pk}/comentarios?ordenar=estoque",
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(response.data["results"])
+
+    def test_renderer_igual_ao_do_drf(self):
+        dados = {
+            "quando": timezone.now(),
+            "dia": timezone.now().date(),
+            "valor": Decimal("19.90"),
+            "texto": "ação\u2028\u2029",
+            "lista": (1, 2.5, None, True),
+            7: "chave inteira",
+        }
+        self.assertEqual(JSONRapidoRenderer().render(dados), JSONRenderer().render(dados))
+
+
+@skipUnless(
+    connection.vendor in BACKENDS_PADRAO, "Banco sem backend de busca textual."
+)
+class BuscaProdutosTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.cafe = criar_produto(descricao="Café torrado em grãos")
+        self.cafeteira = criar_produto(descricao="Cafeteira elétrica")
+        self.pao = criar_produto(descricao="Pão de açúcar")
+
+    def buscar(self, texto: str) -> set:
+        response = self.client.get("/produtos/buscar", {"q": texto})
+        self.assertEqual(response.status_code, 200)
+        return {produto["id"] for produto in response.data}
+
+    def test_busca_ignora_acentos(self):
+        self.assertEqual(self.buscar("cafe torrado"), {self.cafe.pk})
+        self.assertEqual(self.buscar("ACUCAR"), {self.pao.pk})
+        self.assertEqual(self.buscar("eletrica"), {self.cafeteira.pk})
+
+    def test_busca_por_prefixo(self):
+        self.assertEqual(self.buscar("caf"), {self.cafe.pk, self.cafeteira.pk})
+        self.assertEqual(self.buscar("cafet"), {self.cafeteira.pk})
+
+    def test_indice_acompanha_edicao_e_reconstrucao(self):
+        self.pao.descricao = "Pão francês"
+        self.pao.save()
+        self.assertEqual(self.buscar("acucar"), set())
+        self.assertEqual(self.buscar("frances"), {self.pao.pk})
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {busca.TABELA}")
+            self.assertEqual(self.buscar("cafe"), set())
+            obter_backend_busca().reconstruir(cursor)
+        self.assertEqual(self.buscar("cafe"), {self.cafe.pk, self.cafeteira.pk})
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get("/produtos/buscar").status_code, 400)
+        response = self.client.get("/produtos/buscar", {"q": "cafe", "limite": "x"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProvedorControlado(ProvedorCotacao):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chamadas = 0
+        self.falhar = False
+        self.liberar = threading.Event()
+        self.liberar.set()
+
+    def buscar(self) -> float:
+        self.chamadas += 1
+        self.liberar.wait(5)
+        if self.falhar:
+            raise requests.ConnectionError("fora do ar")
+        return 0.2 + self.chamadas
+
+
+class ProvedorCotacaoTests(SimpleTestCase):
+    def test_ttl(self):
+        provedor = ProvedorControlado(ttl=60)
+        with mock.patch("api.cotacao.time.monotonic", return_value=1000.0):
+            self.assertEqual(provedor.obter(), 1.2)
+            self.assertEqual(provedor.obter(), 1.2)
+        self.assertEqual(provedor.chamadas, 1)
+        with mock.patch("api.cotacao.time.monotonic", return_value=1061.0):
+            self.assertEqual(provedor.obter(), 2.2)
+        self.assertEqual(provedor.chamadas, 2)
+
+    def test_requisicoes_simultaneas_compartilham_uma_busca(self):
+        provedor = ProvedorControlado()
+        provedor.liberar.clear()
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(provedor.obter()))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        provedor.liberar.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(resultados, [1.2] * 5)
+        self.assertEqual(provedor.chamadas, 1)
+
+    def test_valor_antigo_durante_atualizacao_e_apos_falha(self):
+        provedor = ProvedorControlado(ttl=60)
+        with mock.patch("api.cotacao.time.monotonic", return_value=1000.0):
+            provedor.obter()
+        with mock.patch("api.cotacao.time.monotonic", return_value=2000.0):
+            provedor.liberar.clear()
+            atualizacao = threading.Thread(target=provedor.obter)
+            atualizacao.start()
+            while provedor.chamadas < 2:
+                time.sleep(0.001)
+            # Outra busca em andamento: responde na hora com o valor antigo.
+            self.assertEqual(provedor.obter(), 1.2)
+            provedor.liberar.set()
+            atualizacao.join()
+        provedor.falhar = True
+        with mock.patch("api.cotacao.time.monotonic", return_value=3000.0):
+            self.assertEqual(provedor.obter(), 2.2)
+        self.assertEqual(provedor.chamadas, 3)
+
+    def test_falha_sem_valor_antigo_propaga(self):
+        provedor = ProvedorControlado()
+        provedor.falhar = True
+        with self.assertRaises(requests.ConnectionError):
+            provedor.obter()
+
+    def test_aobter_compartilha_uma_busca(self):
+        provedor = ProvedorControlado()
+
+        async def consultar():
+            return await asyncio.gather(*(provedor.aobter() for _ in range(5)))
+
+        self.assertEqual(asyncio.run(consultar()), [1.2] * 5)
+        self.assertEqual(provedor.chamadas, 1)
+
+    def test_provedor_sem_buscar_nao_instancia(self):
+        with self.assertRaises(TypeError):
+            ProvedorCotacao()
+
+
+class DetalheProdutoCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.produto = criar_produto(descricao="Original")
+
+    def test_filtros_da_listagem_nao_afetam_o_detalhe(self):
+        Produto.objects.filter(pk=self.produto.pk).update(estoque=0)
+        url = f"/produtos/{self.produto.pk}?em_estoque=true&ordenar=valor"
+        # Sem cache e com cache, a mesma resposta.
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_etag_e_304(self):
+        response = self.client.get(f"/produtos/{self.produto.pk}")
+        etag = response.headers["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                f"/produtos/{self.produto.pk}", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            f"/produtos/{self.produto.pk}", HTTP_IF_NONE_MATCH='"outra"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_pk_com_zero_a_esquerda_usa_a_mesma_entrada(self):
+        self.client.get(f"/produtos/{self.produto.pk}")
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/produtos/0{self.produto.pk}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/produtos/abc").status_code, 404)
+
+    def test_signal_invalida_o_detalhe(self):
+        etag = self.client.get(f"/produtos/{self.produto.pk}").headers["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produto.descricao = "Alterado"
+            self.produto.save()
+        response = self.client.get(
+            f"/produtos/0{self.produto.pk}", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["descricao"], "Alterado")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ComentarioProduto.objects.create(produto=self.produto, usuario=self.usuario)
+        response = self.client.get(f"/produtos/{self.produto.pk}")
+        self.assertEqual(response.data["quantidade_comentarios"], 1)
+
+    def test_leitor_lento_nao_grava_dado_anterior_a_invalidacao(self):
+        _, versao = cache_produto.obter_detalhe(self.produto.pk)
+        antigo = {"descricao": "Original"}
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_produto.invalidar_produtos([self.produto.pk])
+        cache_produto.guardar_detalhe(self.produto.pk, antigo, versao)
+        entrada, _ = cache_produto.obter_detalhe(self.produto.pk)
+        self.assertIsNone(entrada)
+
+
+class ComentariosProdutoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.poucos = criar_produto()
+        ComentarioProduto.objects.create(produto=self.poucos, usuario=self.usuario)
+        self.produto = criar_produto()
+        self.comentarios = [
+            ComentarioProduto.objects.create(produto=self.produto, usuario=self.usuario)
+            for _ in range(45)
+        ]
+
+    def test_listagem_paginada_com_consultas_constantes(self):
+        with self.assertNumQueries(2):
+            self.client.get(f"/produtos/{self.poucos.pk}/comentarios")
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/produtos/{self.produto.pk}/comentarios")
+        self.assertEqual(len(response.data["results"]), 20)
+
+        ids = [c["id"] for c in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            ids += [c["id"] for c in response.data["results"]]
+        self.assertEqual(ids, [c.pk for c in reversed(self.comentarios)])
+
+    def test_tamanho_da_pagina(self):
+        response = self.client.get(
+            f"/produtos/{self.produto.pk}/comentarios?tamanho=7"
+        )
+        self.assertEqual(len(response.data["results"]), 7)
+
+    @override_settings(PRODUTO_COMENTARIOS_RECENTES=3)
+    def test_detalhe_traz_contagem_e_so_os_mais_recentes(self):
+        with self.assertNumQueries(3):
+            self.client.get(f"/produtos/{self.poucos.pk}")
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/produtos/{self.produto.pk}")
+        self.assertEqual(response.data["quantidade_comentarios"], 45)
+        self.assertEqual(
+            [c["id"] for c in response.data["comentarios"]],
+            [c.pk for c in reversed(self.comentarios[-3:])],
+        )
+
+
+class FiltrosProdutoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("c", password="s"))
+        hoje = timezone.localdate()
+        self.vencido = criar_produto(
+            valor=Decimal("5"), data_validade=hoje - timedelta(days=1), estoque=0
+        )
+        self.barato = criar_produto(
+            valor=Decimal("10"), data_validade=hoje + timedelta(days=10), estoque=3
+        )
+        self.caro = criar_produto(
+            valor=Decimal("20"), data_validade=hoje + timedelta(days=100), estoque=1
+        )
+        self.esgotado = criar_produto(
+            valor=Decimal("15.50"), data_validade=hoje + timedelta(days=5), estoque=0
+        )
+        for produto, nota in (
+            (self.vencido, 2.0),
+            (self.barato, 4.5),
+            (self.caro, 3.5),
+            (self.esgotado, 5.0),
+        ):
+            Produto.objects.filter(pk=produto.pk).update(nota_media=nota)
+        self.hoje = hoje
+
+    def ids(self, consulta: str) -> list:
+        response = self.client.get(f"/produtos?{consulta}")
+        self.assertEqual(response.status_code, 200)
+        return [produto["id"] for produto in response.data["results"]]
+
+    def test_faixa_de_valor(self):
+        self.assertEqual(
+            self.ids("valor_min=10&valor_max=15.50&ordenar=valor"),
+            [self.barato.pk, self.esgotado.pk],
+        )
+
+    def test_faixa_de_validade(self):
+        de = self.hoje + timedelta(days=5)
+        ate = self.hoje + timedelta(days=10)
+        self.assertEqual(
+            self.ids(f"validade_de={de}&validade_ate={ate}&ordenar=data_validade"),
+            [self.esgotado.pk, self.barato.pk],
+        )
+
+    def test_em_estoque(self):
+        self.assertEqual(
+            self.ids("em_estoque=true&ordenar=valor"), [self.barato.pk, self.caro.pk]
+        )
+        self.assertEqual(
+            self.ids("em_estoque=false&ordenar=valor"),
+            [self.vencido.pk, self.esgotado.pk],
+        )
+
+    def test_nao_vencido(self):
+        self.assertEqual(
+            self.ids("nao_vencido=true&ordenar=-valor"),
+            [self.caro.pk, self.esgotado.pk, self.barato.pk],
+        )
+        self.assertEqual(self.ids("nao_vencido=false"), [self.vencido.pk])
+
+    def test_nota_minima(self):
+        self.assertEqual(
+            self.ids("nota_minima=4&ordenar=-nota_media"),
+            [self.esgotado.pk, self.barato.pk],
+        )
+
+    def test_ordenacao_permitida(self):
+        self.assertEqual(
+            self.ids("ordenar=estoque"),
+            [self.vencido.pk, self.esgotado.pk, self.caro.pk, self.barato.pk],
+        )
+        self.assertEqual(
+            self.ids("ordenar=-atualizado_em"),
+            [self.esgotado.pk, self.caro.pk, self.barato.pk, self.vencido.pk],
+        )
+
+    def test_ordenacao_fora_da_lista_e_ignorada(self):
+        padrao = self.ids("")
+        self.assertEqual(
+            padrao, [self.esgotado.pk, self.caro.pk, self.barato.pk, self.vencido.pk]
+        )
+        for campo in ("descricao", "soma_notas", "-sku", "usuario__password"):
+            self.assertEqual(self.ids(f"ordenar={campo}"), padrao)
+
+
+class ProdutosEmLoteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.produtos = [criar_produto(descricao=f"Produto {i}") for i in range(10)]
+        for i, produto in enumerate(self.produtos):
+            for _ in range(i % 3):
+                ComentarioProduto.objects.create(produto=produto, usuario=self.usuario)
+
+    def test_consultas_independem_da_quantidade_de_produtos(self):
+        consultas = []
+        for produtos in (self.produtos[:1], self.produtos[1:]):
+            ids = ",".join(str(produto.pk) for produto in produtos)
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.client.get(f"/produtos/lote?ids={ids}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), len(produtos))
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_lote_igual_ao_detalhe_e_na_ordem_pedida(self):
+        ids = [self.produtos[2].pk, 999999, self.produtos[0].pk]
+        response = self.client.get(f"/produtos/lote?ids={','.join(map(str, ids))}")
+        self.assertEqual([p["id"] for p in response.data], [ids[0], ids[2]])
+        cache.clear()
+        detalhe = self.client.get(f"/produtos/{ids[0]}")
+        self.assertEqual(response.data[0], detalhe.data)
+
+    def test_ids_invalidos_ou_acima_do_limite(self):
+        self.assertEqual(self.client.get("/produtos/lote").status_code, 400)
+        self.assertEqual(self.client.get("/produtos/lote?ids=1,a").status_code, 400)
+        with override_settings(PRODUTO_LOTE_MAXIMO=2):
+            response = self.client.get("/produtos/lote?ids=1,2,3")
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportacaoProdutosTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def importar(self, conteudo, formato, **extra):
+        return self.client.post(
+            f"/produtos/importar?formato={formato}",
+            conteudo,
+            content_type="text/csv" if formato == "csv" else "application/jsonl",
+            **extra,
+        )
+
+    def test_importa_csv(self):
+        conteudo = (
+            "sku,descricao,valor,data_validade,estoque\n"
+            "A1,Arroz,12.50,2030-01-01,10\n"
+            "B2,Feijão,8.90,2030-02-01,5\n"
+        )
+        response = self.importar(conteudo, "csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["processados"], 2)
+        self.assertEqual(response.data["gravados"], 2)
+        produto = Produto.objects.get(sku="B2")
+        self.assertEqual(produto.descricao, "Feijão")
+        self.assertEqual(produto.valor, Decimal("8.90"))
+        self.assertEqual(produto.estoque, 5)
+
+    def test_importa_jsonl_com_linha_invalida(self):
+        conteudo = "\n".join(
+            [
+                json.dumps(
+                    {
+                        "sku": "A1",
+                        "descricao": "Arroz",
+                        "valor": "12.50",
+                        "data_validade": "2030-01-01",
+                        "estoque": 10,
+                    }
+                ),
+                "{nao e json",
+                json.dumps({"sku": "B2", "descricao": "Sem valor"}),
+            ]
+        )
+        response = self.importar(conteudo, "jsonl")
+        self.assertEqual(response.data["processados"], 3)
+        self.assertEqual(response.data["gravados"], 1)
+        self.assertEqual(response.data["com_erro"], 2)
+        self.assertEqual([e["linha"] for e in response.data["erros"]], [2, 3])
+        self.assertTrue(Produto.objects.filter(sku="A1").exists())
+
+    def test_atualiza_por_sku_sem_mudar_data_de_criacao(self):
+        produto = criar_produto(sku="A1", descricao="Antigo", estoque=3)
+        criado_em = produto.criado_em
+        conteudo = (
+            "sku,descricao,valor,data_validade,estoque\n"
+            "A1,Novo,15.00,2031-01-01,7\n"
+        )
+        self.importar(conteudo, "csv")
+        produto.refresh_from_db()
+        self.assertEqual(Produto.objects.count(), 1)
+        self.assertEqual(produto.descricao, "Novo")
+        self.assertEqual(produto.estoque, 7)
+        self.assertEqual(produto.criado_em, criado_em)
+
+    def test_estoque_importado_desconta_reservas_ativas(self):
+        produto = criar_produto(sku="A1", estoque=10)
+        estoque.reservar({produto.pk: 3})
+        conteudo = (
+            "sku,descricao,valor,data_validade,estoque\n"
+            "A1,Produto,10.00,2030-01-01,20\n"
+        )
+        self.importar(conteudo, "csv")
+        produto.refresh_from_db()
+        self.assertEqual(produto.estoque, 17)
+        estoque.liberar(ReservaEstoque.objects.all())
+        produto.refresh_from_db()
+        self.assertEqual(produto.estoque, 20)
+
+    def test_sku_repetido_e_informado(self):
+        conteudo = (
+            "sku,descricao,valor,data_validade,estoque\n"
+            "A1,Primeira,10.00,2030-01-01,1\n"
+            "A1,Segunda,10.00,2030-01-01,2\n"
+            "B2,Outro,10.00,2030-01-01,3\n"
+            "A1,Terceira,10.00,2030-01-01,4\n"
+            "C3,Sem valor,,2030-01-01,5\n"
+        )
+        # Lotes de 2: a repetição na linha 2 cai no mesmo lote da linha 1; a
+        # da linha 4 cai em outro lote e é gravada de novo.
+        with override_settings(IMPORTACAO_TAMANHO_LOTE=2):
+            response = self.importar(conteudo, "csv")
+        dados = response.data
+        self.assertEqual(dados["processados"], 5)
+        self.assertEqual(dados["gravados"], 3)
+        self.assertEqual(dados["duplicados"], 1)
+        self.assertEqual(dados["com_erro"], 1)
+        self.assertEqual(
+            dados["processados"],
+            dados["gravados"] + dados["duplicados"] + dados["com_erro"],
+        )
+        self.assertEqual(
+            dados["linhas_duplicadas"],
+            [{"linha": 1, "sku": "A1", "substituida_pela_linha": 2}],
+        )
+        produto = Produto.objects.get(sku="A1")
+        self.assertEqual((produto.descricao, produto.estoque), ("Terceira", 4))
+
+    @override_settings(IMPORTACAO_MAX_ERROS=2)
+    def test_lista_de_duplicados_limitada(self):
+        conteudo = "sku,descricao,valor,data_validade,estoque\n" + "".join(
+            f"A1,Produto {i},10.00,2030-01-01,1\n" for i in range(5)
+        )
+        response = self.importar(conteudo, "csv")
+        self.assertEqual(response.data["duplicados"], 4)
+        self.assertEqual(len(response.data["linhas_duplicadas"]), 2)
+        self.assertEqual(response.data["gravados"], 1)
+
+    @override_settings(IMPORTACAO_MAX_ERROS=2)
+    def test_lista_de_erros_limitada(self):
+        conteudo = "sku,descricao,valor,data_validade,estoque\n" + "".join(
+            f"S{i},Produto,,2030-01-01,1\n" for i in range(5)
+        )
+        response = self.importar(conteudo, "csv")
+        self.assertEqual(response.data["com_erro"], 5)
+        self.assertEqual(len(response.data["erros"]), 2)
+        self.assertFalse(Produto.objects.exists())
+
+
+class StatusPedidoDesatualizadoTests(TestCase):
+    """O status validado é o da linha travada, não o da cópia do request."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.pedido = Pedido.objects.create(usuario=self.usuario)
+        vendas.registrar_pedido(self.pedido)
+
+    def mudar_no_banco(self, status):
+        # Simula o worker mudando o status depois que o request carregou o pedido.
+        pedido = Pedido.objects.get(pk=self.pedido.pk)
+        anterior = pedido.status
+        pedido.status = status
+        pedido.save()
+        vendas.registrar_mudanca_status(pedido, anterior)
+
+    def contadores(self) -> dict:
+        return dict(
+            PedidosPorStatus.objects.filter(quantidade__gt=0).values_list(
+                "status", "quantidade"
+            )
+        )
+
+    def test_atualizar_parte_do_status_atual(self):
+        serializer = AtualizarPedidoSerializer(
+            self.pedido, data={"status": Pedido.Status.ENVIADO}
+        )
+        self.assertTrue(serializer.is_valid())
+        self.mudar_no_banco(Pedido.Status.PROCESSANDO)
+        serializer.save()
+        self.assertEqual(self.contadores(), {Pedido.Status.ENVIADO: 1})
+
+    def test_cancelar_revalida_com_o_status_atual(self):
+        serializer = CancelarPedidoSerializer(self.pedido, data={})
+        self.assertTrue(serializer.is_valid())
+        self.mudar_no_banco(Pedido.Status.ENVIADO)
+        with self.assertRaises(ValidationError):
+            serializer.cancelar()
+        self.assertEqual(Pedido.objects.get().status, Pedido.Status.ENVIADO)
+        self.assertEqual(self.contadores(), {Pedido.Status.ENVIADO: 1})
+
+
+class AgregadosVendasTests(TestCase):
+    """Os agregados incrementais têm de bater com ``vendas.reconstruir``."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.produtos = [
+            criar_produto(descricao=f"Produto {i}", valor=i + 1.5) for i in range(3)
+        ]
+
+    def comprar(self, quantidades) -> int:
+        itens = [
+            {"produto": produto.pk, "quantidade": quantidade}
+            for produto, quantidade in zip(self.produtos, quantidades)
+            if quantidade
+        ]
+        response = self.client.post(
+            "/carrinho/adicionar", {"itens": itens}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post("/pedidos/checkout")
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def agregados(self) -> dict:
+        return {
+            "status": set(
+                PedidosPorStatus.objects.filter(quantidade__gt=0).values_list(
+                    "status", "quantidade"
+                )
+            ),
+            "dias": set(
+                VendaDiaria.objects.filter(pedidos__gt=0).values_list(
+                    "dia", "receita", "pedidos", "itens"
+                )
+            ),
+            "produtos": set(
+                VendaProduto.objects.filter(quantidade__gt=0).values_list(
+                    "produto_id", "quantidade", "receita"
+                )
+            ),
+        }
+
+    def assertAgregadosCorretos(self):
+        incrementais = self.agregados()
+        vendas.reconstruir()
+        self.assertEqual(incrementais, self.agregados())
+
+    def test_criacao_mudanca_de_status_e_cancelamento(self):
+        primeiro = self.comprar([1, 2, 0])
+        segundo = self.comprar([0, 3, 4])
+        self.assertAgregadosCorretos()
+        self.assertEqual(VendaDiaria.objects.get().receita, Decimal("28.00"))
+
+        fila.processar_lote()
+        self.assertAgregadosCorretos()
+
+        response = self.client.put(
+            f"/pedidos/atualizar/{primeiro}", {"status": "Enviado"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertAgregadosCorretos()
+
+        response = self.client.delete(f"/pedidos/cancelar/{segundo}")
+        self.assertEqual(response.status_code, 200)
+        self.assertAgregadosCorretos()
+        self.assertEqual(
+            self.agregados()["status"],
+            {(Pedido.Status.ENVIADO, 1), (Pedido.Status.CANCELADO, 1)},
+        )
+
+
+    def test_pedido_sem_carrinhos_nao_conta_como_venda(self):
+        response = self.client.post(
+            "/pedidos/criar", {"carrinhos": []}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(VendaDiaria.objects.exists())
+        self.assertAgregadosCorretos()
+
+        response = self.client.delete(f"/pedidos/cancelar/{response.data['id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertAgregadosCorretos()
+
+class PaginacaoCursorTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def ids_paginados(self, url: str, editar=None) -> list:
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [item["id"] for item in response.data["results"]]
+            url = response.data["next"]
+            if editar is not None:
+                editar()
+        return ids
+
+    def test_edicoes_durante_a_navegacao_nao_pulam_nem_repetem(self):
+        produtos = [criar_produto(descricao=f"Produto {i}") for i in range(7)]
+
+        def editar():
+            # save() reescreve o criado_em (auto_now) de todos os produtos.
+            for produto in produtos:
+                produto.estoque += 1
+                produto.save()
+
+        ids = self.ids_paginados("/produtos?tamanho=2", editar)
+        self.assertEqual(ids, [produto.pk for produto in reversed(produtos)])
+
+    def test_tamanho_limitado_ao_maximo(self):
+        Produto.objects.bulk_create(
+            Produto(descricao=f"P{i}", valor=1, data_validade="2030-01-01", estoque=1)
+            for i in range(105)
+        )
+        response = self.client.get("/produtos?tamanho=1000")
+        self.assertEqual(len(response.data["results"]), 100)
+        response = self.client.get("/produtos?tamanho=3")
+        self.assertEqual(len(response.data["results"]), 3)
+
+
+class ExportacaoPedidosTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("comprador", password="senha")
+        self.admin = User.objects.create_superuser("admin", password="senha")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.produto = criar_produto(descricao="Café, moído")
+        self.pedidos = [self.criar_pedido(dia) for dia in (1, 10, 20)]
+
+    def criar_pedido(self, dia: int) -> Pedido:
+        pedido = Pedido.objects.create(usuario=self.usuario)
+        carrinho = CarrinhoCompra.objects.create(
+            usuario=self.usuario, pedido=pedido, valor_total=20.0
+        )
+        CarrinhoCompraItem.objects.create(
+            carrinho=carrinho,
+            produto=self.produto,
+            quantidade=2,
+            valor_produto=10.0,
+            valor_total=20.0,
+        )
+        Pedido.objects.filter(pk=pedido.pk).update(
+            atualizado_em=timezone.datetime(2024, 3, dia, 12, tzinfo=timezone.utc)
+        )
+        return pedido
+
+    def exportar(self, url: str) -> str:
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_filtra_pela_data_do_pedido(self):
+        # Mudar o status reescreve criado_em, mas não tira o pedido do período.
+        self.pedidos[0].refresh_from_db()
+        self.pedidos[0].status = Pedido.Status.ENVIADO
+        self.pedidos[0].save()
+        linhas = self.exportar("/pedidos/exportar?de=2024-03-01&ate=2024-03-10")
+        linhas = linhas.splitlines()
+        self.assertEqual(
+            linhas[0].split(",")[:3],
+            ["pedido_id", "pedido_status", "pedido_atualizado_em"],
+        )
+        self.assertEqual(
+            [int(linha.split(",")[0]) for linha in linhas[1:]],
+            [self.pedidos[0].pk, self.pedidos[1].pk],
+        )
+        self.assertIn('"Café, moído"', linhas[1])
+
+    def test_ndjson(self):
+        linhas = self.exportar("/pedidos/exportar?formato=ndjson&de=2024-03-15")
+        linhas = linhas.splitlines()
+        self.assertEqual(len(linhas), 1)
+        registro = json.loads(linhas[0])
+        self.assertEqual(registro["pedido_id"], self.pedidos[2].pk)
+        self.assertEqual(registro["pedido_atualizado_em"], "2024-03-20T12:00:00Z")
+        self.assertEqual(registro["quantidade"], 2)
+
+    def test_parametros_invalidos(self):
+        for url in ("/pedidos/exportar?formato=xml", "/pedidos/exportar?de=ontem"):
+            self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_apenas_administradores(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuario)
+        self.assertEqual(cliente.get("/pedidos/exportar").status_code, 403)
+
+
+class ValoresEmCentavosTests(TestCase):
+    def valor_na_coluna(self, produto):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT valor FROM api_produto WHERE id = %s", [produto.pk]
+            )
+            return cursor.fetchone()[0]
+
+    def test_coluna_guarda_centavos_inteiros(self):
+        produto = criar_produto(valor=19.99)
+        self.assertEqual(self.valor_na_coluna(produto), 1999)
+        self.assertIsInstance(self.valor_na_coluna(produto), int)
+        produto.refresh_from_db()
+        self.assertEqual(produto.valor, Decimal("19.99"))
+
+    def test_soma_no_banco_e_exata(self):
+        criar_produto(valor=Decimal("0.10"))
+        criar_produto(valor=Decimal("0.20"))
+        total = Produto.objects.aggregate(total=Sum("valor"))["total"]
+        self.assertEqual(total, Decimal("0.30"))
+        self.assertEqual(Produto.objects.filter(valor=Decimal("0.10")).count(), 1)
+
+    def test_decimal_arredondado_para_centavos(self):
+        produto = criar_produto(valor=Decimal("10.005"))
+        self.assertEqual(self.valor_na_coluna(produto), 1001)
+        produto = criar_produto(valor=Decimal("7"))
+        produto.refresh_from_db()
+        self.assertEqual(str(produto.valor), "7.00")
+
+    def test_api_rejeita_mais_de_duas_casas(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("c", password="s"))
+        dados = {"descricao": "Produto", "data_validade": "2030-01-01", "estoque": 1}
+        response = client.post(
+            "/produtos", {**dados, "valor": "10.005"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("valor", response.data)
+        response = client.post("/produtos", {**dados, "valor": "10.05"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Produto.objects.get().valor, Decimal("10.05"))
+
+
+class MigracaoCentavosTests(TransactionTestCase):
+    anterior = [("api", "0013_chave_idempotencia")]
+    centavos = [("api", "0014_valores_em_centavos")]
+
+    def migrar(self, alvo):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(alvo)
+        return executor.loader.project_state(alvo).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_migracao_e_reversao(self):
+        apps = self.migrar(self.anterior)
+        Produto = apps.get_model("api", "Produto")
+        produto = Produto.objects.create(
+            descricao="Produto", valor=19.99, data_validade="2030-01-01", estoque=1
+        )
+
+        self.migrar(self.centavos)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT valor FROM api_produto WHERE id = %s", [produto.pk])
+            self.assertEqual(cursor.fetchone()[0], 1999)
+
+        apps = self.migrar(self.anterior)
+        valor = apps.get_model("api", "Produto").objects.get(pk=produto.pk).valor
+        self.assertAlmostEqual(valor, 19.99)
+
+
+class ReservaEstoqueConcorrenciaTests(TransactionTestCase):
+    WORKERS = 16
+    TENTATIVAS = 10
+
+    def test_reservas_concorrentes_nao_vendem_alem_do_estoque(self):
+        produto = criar_produto(estoque=50)
+        sucessos = []
+        erros = []
+        barreira = threading.Barrier(self.WORKERS)
+
+        def worker():
+            try:
+                barreira.wait()
+                for _ in range(self.TENTATIVAS):
+                    try:
+                        reservas = estoque.reservar({produto.pk: 1})
+                    except estoque.EstoqueInsuficiente:
+                        continue
+                    sucessos.append(reservas[0].pk)
+                    if len(sucessos) % 3 == 0:
+                        estoque.liberar(ReservaEstoque.objects.filter(pk=reservas[0].pk))
+            except Exception as exc:
+                erros.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erros, [])
+        produto.refresh_from_db()
+        ativas = ReservaEstoque.objects.filter(status=ReservaEstoque.Status.ATIVA)
+        reservado = sum(ativas.values_list("quantidade", flat=True))
+        self.assertGreaterEqual(produto.estoque, 0)
+        self.assertEqual(produto.estoque + reservado, 50)
+        self.assertEqual(len(sucessos), ReservaEstoque.objects.count())
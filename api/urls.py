@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from api import views
+from api import views, views_async
 
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r"produtos", views.ProdutoViewSet)
@@ -10,12 +10,17 @@ router.register(r"carrinho/atualizar", views.CarrinhoCompraAtualizarViewSet)
 router.register(r"carrinho/remover", views.CarrinhoCompraDeletarViewSet)
 router.register(r"carrinho", views.CarrinhoCompraAtualViewSet)
 router.register(r"pedidos/criar", views.CriarPedidoViewSet)
+router.register(r"pedidos/checkout", views.CheckoutViewSet, basename="checkout")
 router.register(r"pedidos/atualizar", views.AtualizarPedidoViewSet)
 router.register(r"pedidos/cancelar", views.CancelarPedidoViewSet)
 router.register(r"pedidos", views.PedidoViewSet)
 router.register(r"usuarios", views.UsuarioViewSet)
+router.register(r"dashboard", views.DashboardViewSet, basename="dashboard")
+router.register(r"metricas", views.MetricasViewSet, basename="metricas")
 router.register(r"consultas", views.ConsultasViewSet, basename='consultas')
 
 urlpatterns = [
+    path("async/consultas/cep/<str:cep>", views_async.cep),
+    path("async/carrinho", views_async.carrinho_atual),
     path("", include(router.urls)),
 ]
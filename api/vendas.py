@@ -0,0 +1,163 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+from api.models import (
+    CarrinhoCompra,
+    CarrinhoCompraItem,
+    Pedido,
+    PedidosPorStatus,
+    VendaDiaria,
+    VendaProduto,
+)
+
+
+def _incrementar(model, campo_chave: str, deltas: dict):
+    """Soma ``deltas`` ({chave: {campo: valor}}) nas linhas agregadas.
+
+    As linhas que ainda não existem são criadas antes com
+    ``ignore_conflicts`` e todos os campos são atualizados num único UPDATE.
+    """
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**{campo_chave: chave}) for chave in deltas], ignore_conflicts=True
+    )
+    campos = {campo for valores in deltas.values() for campo in valores}
+    atualizacoes = {}
+    for campo in campos:
+        output_field = model._meta.get_field(campo)
+        atualizacoes[campo] = F(campo) + Case(
+            *[
+                When(
+                    **{campo_chave: chave},
+                    then=Value(valores.get(campo, 0), output_field=output_field),
+                )
+                for chave, valores in deltas.items()
+            ],
+            default=Value(0, output_field=output_field),
+            output_field=output_field,
+        )
+    model.objects.filter(**{f"{campo_chave}__in": list(deltas)}).update(
+        **atualizacoes
+    )
+
+
+def _dia_do_pedido(pedido: Pedido):
+    # ``atualizado_em`` é o campo com auto_now_add, ou seja, a data de criação.
+    return pedido.atualizado_em.date()
+
+
+def _contabilizar_vendas(pedido: Pedido, sinal: int):
+    carrinhos = CarrinhoCompra.objects.filter(pedido=pedido).aggregate(
+        quantidade=Count("id"), total=Sum("valor_total")
+    )
+    # Um pedido sem carrinhos (``/pedidos/criar`` aceita a lista vazia) não
+    # entra nas vendas: ``reconstruir`` só alcança pedidos pelos carrinhos.
+    if not carrinhos["quantidade"]:
+        return
+    receita = carrinhos["total"] or 0
+    produtos = {
+        produto_id: {"quantidade": sinal * quantidade, "receita": sinal * valor}
+        for produto_id, quantidade, valor in CarrinhoCompraItem.objects.filter(
+            carrinho__pedido=pedido
+        )
+        .values("produto_id")
+        .annotate(quantidade=Sum("quantidade"), valor=Sum("valor_total"))
+        .values_list("produto_id", "quantidade", "valor")
+    }
+    _incrementar(
+        VendaDiaria,
+        "dia",
+        {
+            _dia_do_pedido(pedido): {
+                "receita": sinal * receita,
+                "pedidos": sinal,
+                "itens": sum(p["quantidade"] for p in produtos.values()),
+            }
+        },
+    )
+    _incrementar(VendaProduto, "produto_id", produtos)
+
+
+def registrar_pedido(pedido: Pedido):
+    with transaction.atomic():
+        _incrementar(PedidosPorStatus, "status", {pedido.status: {"quantidade": 1}})
+        if pedido.status != Pedido.Status.CANCELADO:
+            _contabilizar_vendas(pedido, 1)
+
+
+def registrar_mudanca_status(pedido: Pedido, anterior: str):
+    """Move o pedido de ``anterior`` para ``pedido.status`` nos agregados.
+
+    ``anterior`` precisa vir da linha do pedido travada com
+    ``select_for_update`` na mesma transação que grava o novo status; lido de
+    uma cópia antiga, o contador errado seria decrementado.
+    """
+    if anterior == pedido.status:
+        return
+    with transaction.atomic():
+        _incrementar(
+            PedidosPorStatus,
+            "status",
+            {anterior: {"quantidade": -1}, pedido.status: {"quantidade": 1}},
+        )
+        if pedido.status == Pedido.Status.CANCELADO:
+            _contabilizar_vendas(pedido, -1)
+        elif anterior == Pedido.Status.CANCELADO:
+            _contabilizar_vendas(pedido, 1)
+
+
+def reconstruir():
+    with transaction.atomic():
+        PedidosPorStatus.objects.all().delete()
+        VendaDiaria.objects.all().delete()
+        VendaProduto.objects.all().delete()
+
+        PedidosPorStatus.objects.bulk_create(
+            PedidosPorStatus(status=linha["status"], quantidade=linha["total"])
+            for linha in Pedido.objects.order_by()
+            .values("status")
+            .annotate(total=Count("id"))
+        )
+
+        ativos = {"carrinho__pedido__isnull": False}
+        cancelados = {"carrinho__pedido__status": Pedido.Status.CANCELADO}
+        dias = {}
+        for linha in (
+            CarrinhoCompra.objects.filter(pedido__isnull=False)
+            .exclude(pedido__status=Pedido.Status.CANCELADO)
+            .annotate(dia=TruncDate("pedido__atualizado_em"))
+            .order_by()
+            .values("dia")
+            .annotate(receita=Sum("valor_total"), pedidos=Count("pedido", distinct=True))
+        ):
+            dias[linha["dia"]] = VendaDiaria(
+                dia=linha["dia"], receita=linha["receita"], pedidos=linha["pedidos"]
+            )
+        for linha in (
+            CarrinhoCompraItem.objects.filter(**ativos)
+            .exclude(**cancelados)
+            .annotate(dia=TruncDate("carrinho__pedido__atualizado_em"))
+            .order_by()
+            .values("dia")
+            .annotate(itens=Sum("quantidade"))
+        ):
+            dias[linha["dia"]].itens = linha["itens"]
+        VendaDiaria.objects.bulk_create(dias.values(), batch_size=1000)
+
+        VendaProduto.objects.bulk_create(
+            (
+                VendaProduto(
+                    produto_id=linha["produto_id"],
+                    quantidade=linha["quantidade"],
+                    receita=linha["receita"],
+                )
+                for linha in CarrinhoCompraItem.objects.filter(**ativos)
+                .exclude(**cancelados)
+                .order_by()
+                .values("produto_id")
+                .annotate(quantidade=Sum("quantidade"), receita=Sum("valor_total"))
+            ),
+            batch_size=1000,
+        )
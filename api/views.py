@@ -2,16 +2,41 @@ from rest_framework import viewsets, mixins
 from rest_framework.response import Response
 from rest_framework.request import Request
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from django.db.models import Q
+from django_filters.rest_framework import DjangoFilterBackend
+from api import (
+    cache_produto,
+    checkout,
+    estoque,
+    exportacao,
+    importacao,
+    instrumentacao,
+)
+from api.autenticacao import invalidar_usuario
+from api.busca import obter_backend_busca
+from api.filters import OrdenacaoFiltro, ProdutoFiltro
+from api.cep import CepIndisponivel, obter_resolvedor_cep
 from api.helpers import create_url_path
-import requests
+from api.pagination import UsuarioCursorPaginacao
+from api.serializacao import ListagemRapidaMixin, serializacao_rapida_ativa
 
 from api.models import (
     AvaliacaoProduto,
+    ComentarioProduto,
     Pedido,
     Produto,
     CarrinhoCompra,
+    PedidosPorStatus,
+    ReservaEstoque,
+    VendaDiaria,
+    VendaProduto,
 )
 from api.serializers import (
     CancelarPedidoSerializer,
@@ -31,21 +56,130 @@ from api.serializers import (
 )
 
 
-class ProdutoViewSet(viewsets.ModelViewSet):
+class ProdutoViewSet(ListagemRapidaMixin, viewsets.ModelViewSet):
     queryset = Produto.objects.all()
     serializer_class = ProdutoSerializer
+    filter_backends = [DjangoFilterBackend, OrdenacaoFiltro]
+    filterset_class = ProdutoFiltro
+    ordering_fields = [
+        "valor",
+        "data_validade",
+        "nota_media",
+        "estoque",
+        "atualizado_em",
+    ]
+    ordering = ["-atualizado_em", "-id"]
+
+    def filter_queryset(self, queryset):
+        # Filtros e ordenação valem só para a listagem. Em get_object eles
+        # fariam /produtos/<id>?em_estoque=true responder 404 ou 200
+        # conforme o detalhe estivesse ou não no cache.
+        if self.action != "list":
+            return queryset
+        return super().filter_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return ProdutoDetalhadoSerializer
         return super().get_serializer_class()
 
-    @action(detail=True, methods=["GET"])
+    def retrieve(self, request, *args, **kwargs):
+        # O pk vem da URL como texto; normalizado, /produtos/01 e /produtos/1
+        # usam a mesma entrada, a mesma que invalidar_produtos apaga.
+        try:
+            pk = int(kwargs["pk"])
+        except ValueError:
+            raise Http404
+        entrada, versao = cache_produto.obter_detalhe(pk)
+        if entrada is None:
+            produto = self.get_object()
+            serializer = self.get_serializer(produto)
+            entrada = cache_produto.guardar_detalhe(pk, serializer.data, versao)
+        etag = quote_etag(entrada["etag"])
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=304, headers={"ETag": etag})
+        return Response(entrada["data"], headers={"ETag": etag})
+
+    @action(detail=False, methods=["POST"])
+    def importar(self, request):
+        formato = request.query_params.get("formato")
+        if formato is None:
+            formato = "jsonl" if "json" in request.content_type else "csv"
+        if formato not in ("csv", "jsonl"):
+            return Response({"detail": "Formato deve ser csv ou jsonl."}, status=400)
+        registros = importacao.ler_registros(
+            importacao.linhas_texto(request._request), formato
+        )
+        return Response(importacao.importar(registros))
+
+    @action(detail=False, methods=["GET"])
+    def lote(self, request):
+        valores = request.query_params.get("ids", "").split(",")
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in valores if pk.strip()))
+        except ValueError:
+            return Response(
+                {"detail": "ids deve ser uma lista de números separados por vírgula."},
+                status=400,
+            )
+        if not ids:
+            return Response({"detail": "Informe os produtos em ids."}, status=400)
+        maximo = getattr(settings, "PRODUTO_LOTE_MAXIMO", 50)
+        if len(ids) > maximo:
+            return Response(
+                {"detail": f"No máximo {maximo} produtos por requisição."}, status=400
+            )
+
+        # Mesmo cache do retrieve: só os produtos fora dele vão ao banco, todos
+        # de uma vez.
+        entradas, versoes = cache_produto.obter_detalhes(ids)
+        faltando = [pk for pk in ids if pk not in entradas]
+        if faltando:
+            produtos = ProdutoDetalhadoSerializer.carregar_varios(faltando)
+            entradas.update(
+                cache_produto.guardar_detalhes(
+                    {
+                        produto.pk: ProdutoDetalhadoSerializer(produto).data
+                        for produto in produtos
+                    },
+                    versoes,
+                )
+            )
+        return Response([entradas[pk]["data"] for pk in ids if pk in entradas])
+
+    @action(detail=False, methods=["GET"])
+    def buscar(self, request):
+        texto = request.query_params.get("q", "").strip()
+        if not texto:
+            return Response({"detail": "Informe o termo de busca em q."}, status=400)
+        config = getattr(settings, "BUSCA", {})
+        limite = request.query_params.get("limite", config.get("LIMITE_PADRAO", 20))
+        try:
+            limite = int(limite)
+        except ValueError:
+            return Response({"detail": "limite deve ser um número inteiro."}, status=400)
+        limite = max(1, min(limite, config.get("LIMITE_MAXIMO", 100)))
+
+        backend = obter_backend_busca()
+        if backend is None:
+            return Response({"detail": "Busca indisponível neste banco."}, status=501)
+        ids = backend.buscar(texto, limite)
+        produtos = Produto.objects.in_bulk(ids)
+        resultado = [produtos[pk] for pk in ids if pk in produtos]
+        return Response(self.get_serializer(resultado, many=True).data)
+
+    # Sem os filtros do viewset: ``ordenar`` lista campos de Produto, e a
+    # paginação por cursor o aplicaria a esta listagem.
+    @action(detail=True, methods=["GET"], filter_backends=[])
     def avaliacoes(self, request, pk=None):
         produto = self.get_object()
         avaliacoes = AvaliacaoProduto.objects.filter(produto=produto)
-        serializer = AvaliacaoProdutoSerializer(avaliacoes, many=True)
-        return Response(serializer.data)
+        if serializacao_rapida_ativa():
+            return self.listar_rapido(avaliacoes, AvaliacaoProdutoSerializer)
+        pagina = self.paginate_queryset(avaliacoes)
+        serializer = AvaliacaoProdutoSerializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=["POST"])
     def avaliacao(self, request, pk=None):
@@ -56,6 +190,14 @@ class ProdutoViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status=201)
 
+    @action(detail=True, methods=["GET"], filter_backends=[])
+    def comentarios(self, request, pk=None):
+        produto = self.get_object()
+        comentarios = ComentarioProduto.objects.filter(produto=produto)
+        pagina = self.paginate_queryset(comentarios)
+        serializer = ComentarioProdutoSerializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=["POST"])
     def comentario(self, request, pk=None):
         request.data["produto"] = self.get_object().pk
@@ -72,7 +214,7 @@ class CarrinhoCompraAtualViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         return CarrinhoCompra.objects.filter(
-            Q(usuario=self.request.user) and Q(pedido=None)
+            Q(usuario=self.request.user) & Q(pedido=None)
         )
 
 
@@ -105,12 +247,58 @@ class CarrinhoCompraDeletarViewSet(mixins.DestroyModelMixin, viewsets.GenericVie
     queryset = CarrinhoCompra.objects.all()
     serializer_class = CarrinhoComprasSerializer
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            estoque.liberar(ReservaEstoque.objects.filter(carrinho=instance))
+            instance.delete()
+
 
 class PedidoViewSet(
-    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+    ListagemRapidaMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
 ):
     queryset = Pedido.objects.all()
 
+    @action(detail=False, methods=["GET"], permission_classes=[IsAdminUser])
+    def exportar(self, request):
+        formato = request.query_params.get("formato", "csv")
+        if formato not in ("csv", "ndjson"):
+            return Response({"detail": "Formato deve ser csv ou ndjson."}, status=400)
+        datas = {}
+        for parametro in ("de", "ate"):
+            valor = request.query_params.get(parametro)
+            if valor is None:
+                continue
+            datas[parametro] = exportacao.interpretar_data(
+                valor, fim=parametro == "ate"
+            )
+            if datas[parametro] is None:
+                return Response(
+                    {parametro: "Data inválida, use AAAA-MM-DD ou ISO 8601."},
+                    status=400,
+                )
+        linhas = exportacao.itens_vendidos(**datas)
+        if formato == "csv":
+            response = StreamingHttpResponse(
+                exportacao.gerar_csv(linhas), content_type="text/csv"
+            )
+            response["Content-Disposition"] = 'attachment; filename="pedidos.csv"'
+        else:
+            response = StreamingHttpResponse(
+                exportacao.gerar_ndjson(linhas), content_type="application/x-ndjson"
+            )
+        return response
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related(
+                *PedidoDetalhadoSerializer.PREFETCH_RELATED
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.action == "retrieve":
             return PedidoDetalhadoSerializer
@@ -122,6 +310,36 @@ class CriarPedidoViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     serializer_class = CriarPedidoSerializer
 
 
+class CheckoutViewSet(viewsets.ViewSet):
+    def create(self, request):
+        chave = request.headers.get("Idempotency-Key")
+        if chave is not None and not 0 < len(chave) <= 255:
+            return Response(
+                {"detail": "Idempotency-Key deve ter de 1 a 255 caracteres."},
+                status=400,
+            )
+        try:
+            pedido, repetido = checkout.finalizar_compra(request.user, chave)
+        except checkout.CarrinhoVazio:
+            return Response({"detail": "Nenhum carrinho aberto com itens."}, status=400)
+        except estoque.EstoqueInsuficiente as exc:
+            return Response(
+                {
+                    "carrinhos": [
+                        {"produto": int(pk), "detail": "Produto não possui estoque"}
+                        for pk in exc.produtos
+                    ]
+                },
+                status=400,
+            )
+        headers = {"Idempotent-Replayed": "true"} if repetido else {}
+        return Response(
+            PedidoDetalhadoSerializer.carregar(pedido).data,
+            status=200 if repetido else 201,
+            headers=headers,
+        )
+
+
 class AtualizarPedidoViewSet(mixins.UpdateModelMixin, viewsets.GenericViewSet):
     queryset = Pedido.objects.all()
     serializer_class = AtualizarPedidoSerializer
@@ -148,6 +366,7 @@ class UsuarioViewSet(
     viewsets.GenericViewSet,
 ):
     queryset = User.objects.all()
+    pagination_class = UsuarioCursorPaginacao
 
     def get_permissions(self):
         if self.action == "create":
@@ -159,6 +378,12 @@ class UsuarioViewSet(
             return CriarUsuarioSerializer
         return UsuarioSerializer
 
+    def perform_update(self, serializer):
+        usuario = serializer.save()
+        # O usuário autenticado fica em cache por processo; sem isso uma
+        # conta desativada continuaria aceita até o TTL vencer.
+        transaction.on_commit(lambda: invalidar_usuario(usuario.pk))
+
 
 class AvaliacaoProdutoViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     serializer_class = AvaliacaoProdutoSerializer
@@ -170,33 +395,68 @@ class AvaliacaoProdutoViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     def list(self, request, *args, **kwargs):
         return AvaliacaoProduto.objects.filter(produto_id=self.kwargs["id"])
 
+
+class DashboardViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    @action(detail=False, methods=["GET"], url_path="receita-diaria")
+    def receita_diaria(self, request):
+        dias = VendaDiaria.objects.order_by("dia")
+        de = request.query_params.get("de")
+        ate = request.query_params.get("ate")
+        try:
+            if de:
+                dias = dias.filter(dia__gte=de)
+            if ate:
+                dias = dias.filter(dia__lte=ate)
+            return Response(list(dias.values("dia", "receita", "pedidos", "itens")))
+        except ValidationError:
+            return Response(
+                {"detail": "Datas devem estar no formato AAAA-MM-DD."}, status=400
+            )
+
+    @action(detail=False, methods=["GET"], url_path="produtos-mais-vendidos")
+    def produtos_mais_vendidos(self, request):
+        try:
+            limite = min(int(request.query_params.get("limite", 10)), 100)
+        except ValueError:
+            return Response(
+                {"detail": "limite deve ser um número inteiro."}, status=400
+            )
+        produtos = (
+            VendaProduto.objects.filter(quantidade__gt=0)
+            .order_by("-quantidade")
+            .values("produto_id", "produto__descricao", "quantidade", "receita")
+        )
+        return Response(list(produtos[:limite]))
+
+    @action(detail=False, methods=["GET"], url_path="pedidos-por-status")
+    def pedidos_por_status(self, request):
+        return Response(
+            {
+                linha["status"]: linha["quantidade"]
+                for linha in PedidosPorStatus.objects.values("status", "quantidade")
+            }
+        )
+
+
+class MetricasViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        if not instrumentacao.instrumentacao_ativa():
+            return Response({"detail": "Instrumentação desativada."}, status=404)
+        return Response(instrumentacao.registro.resumo())
+
+
 class ConsultasViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['GET'], url_path=create_url_path('cep/:cep'))
     def cep(self, request, cep: str):
-        
-        url = f'https://viacep.com.br/ws/{cep}/json/'
-
-        # Fazer a requisição GET para a URL e verificar se o status code é 200
-        response = requests.get(url)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            cep = data['cep']
-            rua = data['logradouro']
-            bairro = data['bairro']
-            cidade = data['localidade']
-            estado = data['uf']
-
-            result = {
-            'cep': cep,
-            'rua': rua,
-            'bairro': bairro,
-            'cidade': cidade,
-            'estado': estado
-            }
-            
-            return Response(result)
-        else:
-        # Retornar uma resposta de erro se o status code não for 200
-            return Response({'error': 'CEP inválido ou não encontrado'}, status=response.status_code)
\ No newline at end of file
+        try:
+            result = obter_resolvedor_cep().resolver(cep)
+        except CepIndisponivel:
+            return Response({'error': 'Serviço de CEP indisponível'}, status=503)
+
+        if result is None:
+            return Response({'error': 'CEP inválido ou não encontrado'}, status=404)
+        return Response(result)
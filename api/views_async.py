@@ -0,0 +1,61 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.autenticacao import JWTAutenticacaoCache
+from api.cep import CepIndisponivel, obter_resolvedor_cep
+from api.cotacao import obter_provedor_cotacao
+from api.models import CarrinhoCompra
+from api.serializers import CarrinhoComprasAtualSerializer
+
+
+async def autenticar(request):
+    try:
+        resultado = await JWTAutenticacaoCache().aauthenticate(request)
+    except APIException as exc:
+        return None, JsonResponse({"detail": str(exc.detail)}, status=exc.status_code)
+    if resultado is None:
+        return None, JsonResponse(
+            {"detail": str(NotAuthenticated.default_detail)},
+            status=NotAuthenticated.status_code,
+        )
+    return resultado[0], None
+
+
+async def cep(request, cep: str):
+    _, erro = await autenticar(request)
+    if erro is not None:
+        return erro
+    try:
+        result = await obter_resolvedor_cep().aresolver(cep)
+    except CepIndisponivel:
+        return JsonResponse({"error": "Serviço de CEP indisponível"}, status=503)
+
+    if result is None:
+        return JsonResponse({"error": "CEP inválido ou não encontrado"}, status=404)
+    return JsonResponse(result)
+
+
+async def carrinho_atual(request):
+    usuario, erro = await autenticar(request)
+    if erro is not None:
+        return erro
+    cotacao = await obter_provedor_cotacao().aobter()
+    carrinhos = [
+        carrinho
+        async for carrinho in CarrinhoCompra.objects.filter(
+            Q(usuario=usuario) & Q(pedido=None)
+        )
+    ]
+
+    def serializar():
+        return CarrinhoComprasAtualSerializer(
+            carrinhos, many=True, context={"cotacao": cotacao}
+        ).data
+
+    # O encoder do DRF, para os valores saírem como no GET /carrinho.
+    return JsonResponse(
+        await sync_to_async(serializar)(), encoder=JSONEncoder, safe=False
+    )
@@ -1,4 +1,5 @@
 import datetime
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,10 +19,12 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "rest_framework_simplejwt",
+    "django_filters",
     "api",
 ]
 
 MIDDLEWARE = [
+    "api.instrumentacao.InstrumentacaoMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,13 +55,100 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "compra_venda_produtos.wsgi.application"
 
-DATABASES = {
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DB_NAME", "compra_venda_produtos"),
+            "USER": os.environ.get("DB_USER", ""),
+            "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+            "HOST": os.environ.get("DB_HOST", ""),
+            "PORT": os.environ.get("DB_PORT", ""),
+            "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "api.db.sqlite3",
+            "NAME": os.environ.get("DB_NAME", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": True,
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+    }
+
+# Aplicado pelo backend api.db.sqlite3 a cada nova conexão. O WAL deixa
+# leituras rodarem em paralelo com a escrita, e o BEGIN IMMEDIATE junto com
+# busy_timeout faz escritores concorrentes esperarem pelo lock em vez de
+# falharem com "database is locked".
+SQLITE = {
+    "TRANSACTION_MODE": os.environ.get("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+    "PRAGMAS": {
+        "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", "5000")),
+        "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    },
+}
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+if os.environ.get("CACHE_REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["CACHE_REDIS_URL"],
     }
+
+PRODUTO_CACHE_TIMEOUT = 300
+
+PRODUTO_COMENTARIOS_RECENTES = 5
+
+PRODUTO_LOTE_MAXIMO = 50
+
+IMPORTACAO_TAMANHO_LOTE = 1000
+
+IMPORTACAO_MAX_ERROS = 1000
+
+EXPORTACAO_CHUNK_SIZE = 2000
+
+BUSCA = {
+    "BACKEND": None,
+    "LIMITE_PADRAO": 20,
+    "LIMITE_MAXIMO": 100,
+}
+
+HTTP_ASYNC = {
+    "TIMEOUT": 3.0,
+    "MAX_CONEXOES": 200,
+    "MAX_CONEXOES_OCIOSAS": 50,
 }
 
+FILA = {
+    "TAMANHO_LOTE": 100,
+    "VISIBILIDADE": 300,
+    "MAX_TENTATIVAS": 5,
+    "ATRASO_BASE": 5,
+    "INTERVALO": 1.0,
+    "TAREFAS": {
+        "processar_pedido": "api.tarefas.processar_pedidos",
+        "notificar_pedido": "api.tarefas.notificar_pedidos",
+    },
+}
+
+EMAIL_BACKEND = os.environ.get(
+    "EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
+)
+
+INSTRUMENTACAO_ATIVA = os.environ.get("INSTRUMENTACAO_ATIVA") == "1"
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -96,10 +186,47 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication"
+        "api.autenticacao.JWTAutenticacaoCache"
+    ],
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.CursorPaginacao",
+    "PAGE_SIZE": 20,
+    "ORDERING_PARAM": "ordenar",
+    "COERCE_DECIMAL_TO_STRING": False,
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.JSONRapidoRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ],
 }
 
+# Listagens de produtos, pedidos e avaliações serializadas direto das tuplas
+# do banco (api.serializacao); False volta ao ModelSerializer do DRF.
+SERIALIZACAO_RAPIDA = True
+
+PAGINACAO_TAMANHO_MAXIMO = 100
+
+RESERVA_VALIDADE = 900
+
+# Segundos em que um Idempotency-Key do checkout devolve o mesmo pedido; depois
+# disso o comando limpar_chaves_idempotencia apaga a chave.
+IDEMPOTENCIA_VALIDADE = 86400
+
+COTACAO = {
+    "PROVEDOR": "api.cotacao.ExchangeRateApiProvedor",
+    "OPCOES": {"ttl": 600.0, "timeout": 3.0},
+}
+
+CEP = {
+    "CLIENTE": "api.cep.ClienteViaCep",
+    "OPCOES": {"timeout": 3.0},
+    "TAMANHO_LRU": 10000,
+    "TTL_NEGATIVO": 86400,
+}
+
+AUTENTICACAO_CACHE = {
+    "TTL": 60.0,
+    "TAMANHO": 10000,
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": datetime.timedelta(hours=7),
     "REFRESH_TOKEN_LIFETIME": datetime.timedelta(days=7),